@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from urllib.parse import parse_qs
+import predictor
+from predictor import VERSION_HEADER, RESPONSE_MAX_AGE, WARMUP_TIMEOUT, response_cache, format_probabilities
+from predictor import metrics_registry, request_seconds, stage_seconds
+
+# Server settings
+BIND_HOST = os.environ.get("ASYNC_HOST", "127.0.0.1")
+BIND_PORT = int(os.environ.get("ASYNC_PORT", 5000))
+
+# Concurrent /predict requests are coalesced into one model call of at most this many pairings,
+# waiting at most this many milliseconds for the batch to fill
+MAX_BATCH_SIZE = int(os.environ.get("ASYNC_MAX_BATCH_SIZE", 64))
+MAX_WAIT_MS = float(os.environ.get("ASYNC_MAX_WAIT_MS", 2))
+
+class PredictionBatcher:
+    """Coalesces concurrent single-fixture predictions into batched model calls.
+
+    The first request for a new batch starts a timer of `max_wait` seconds. The batch is
+    predicted with one predict_rows call on a worker thread once the timer fires or it
+    holds `max_batch_size` pairings. A request for a pairing that is already waiting or
+    being predicted shares that pairing's result instead of adding a row.
+    """
+
+    def __init__(self, max_batch_size, max_wait):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.pending = {}    # (version, home_row, away_row) -> future, for the batch being filled
+        self.in_flight = {}  # The same, for batches being predicted
+        self.batch_state = None
+        self.flush_timer = None
+        self.tasks = set()
+        self.batches = 0
+        self.coalesced = 0
+
+    async def predict(self, current, home_row, away_row):
+        """Return the class probabilities of one pairing under `current`."""
+        key = (current.version, home_row, away_row)
+        future = self.pending.get(key) or self.in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            # A batch is predicted with a single state, so a reload starts a new one
+            if self.pending and self.batch_state is not current:
+                self.flush()
+
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self.pending[key] = future
+            self.batch_state = current
+            if len(self.pending) >= self.max_batch_size:
+                self.flush()
+            elif self.flush_timer is None:
+                self.flush_timer = loop.call_later(self.max_wait, self.flush)
+
+        # Shielded so one client disconnecting doesn't cancel the result for the others sharing it
+        return await asyncio.shield(future)
+
+    def flush(self):
+        """Start predicting the pending batch."""
+        if self.flush_timer is not None:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+        if not self.pending:
+            return
+
+        batch, self.pending = self.pending, {}
+        self.in_flight.update(batch)
+        task = asyncio.get_running_loop().create_task(self.run_batch(self.batch_state, batch))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def run_batch(self, current, batch):
+        keys = list(batch)
+        home_rows = [home_row for _, home_row, _ in keys]
+        away_rows = [away_row for _, _, away_row in keys]
+        self.batches += 1
+        try:
+            with stage_seconds.time("batch_predict"):
+                probabilities = await asyncio.get_running_loop().run_in_executor(None, current.predict_rows, home_rows, away_rows)
+        except Exception as e:
+            for future in batch.values():
+                future.set_exception(e)
+        else:
+            for future, pair_probabilities in zip(batch.values(), probabilities):
+                future.set_result(pair_probabilities)
+        finally:
+            for key in keys:
+                self.in_flight.pop(key, None)
+
+batcher = PredictionBatcher(MAX_BATCH_SIZE, MAX_WAIT_MS / 1000)
+metrics_registry.callback("predictor_coalesced_batches_total", "counter", "Batched model calls made for /predict.", (),
+                          lambda: [((), batcher.batches)])
+metrics_registry.callback("predictor_coalesced_requests_total", "counter", "/predict requests that shared a pairing already being predicted.", (),
+                          lambda: [((), batcher.coalesced)])
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def serialize(payload):
+    """JSON bytes as the Flask app would return them, so both servers produce the same bodies and ETags."""
+    return predictor.app.json.response(payload).get_data()
+
+async def current_state():
+    """Return the loaded serving state, waiting for warm-up without blocking the event loop."""
+    if predictor.state is None:
+        await asyncio.get_running_loop().run_in_executor(None, predictor.state_ready.wait, WARMUP_TIMEOUT)
+    if predictor.state is None:
+        raise HTTPError(503, "Model and team data are not loaded yet.")
+    return predictor.state
+
+async def read_json(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        raise HTTPError(400, "Request body must be JSON.")
+
+async def send_response(send, status, body, headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"access-control-allow-origin", b"*"), *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+async def send_cached(send, scope, current, entry):
+    """Send a cached body, or an empty 304 when a GET already holds it."""
+    headers = [(b"content-type", b"application/json"), (VERSION_HEADER.lower().encode(), current.version.encode())]
+    if scope["method"] != "GET":
+        return await send_response(send, 200, entry.body, headers)
+
+    etag = f'"{entry.etag}"'
+    headers += [(b"etag", etag.encode()), (b"cache-control", f"public, max-age={RESPONSE_MAX_AGE}".encode())]
+    if_none_match = dict(scope["headers"]).get(b"if-none-match", b"").decode("latin-1")
+    if if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return await send_response(send, 304, b"", headers)
+    await send_response(send, 200, entry.body, headers)
+
+async def health(scope, receive, send):
+    current = predictor.state
+    body = serialize({"status": "ok", "ready": current is not None, "version": current.version if current else None})
+    await send_response(send, 200, body, [(b"content-type", b"application/json")])
+
+async def get_teams(scope, receive, send):
+    current = await current_state()
+    key = ("teams", (), current.version)
+    with stage_seconds.time("cache_lookup"):
+        entry = response_cache.get(key)
+    if entry is None:
+        with stage_seconds.time("serialize"):
+            entry = response_cache.put(key, serialize({"teams": current.team_index.teams, "version": current.version}))
+    await send_cached(send, scope, current, entry)
+
+async def predict(scope, receive, send):
+    if scope["method"] == "GET":
+        data = {name: values[0] for name, values in parse_qs(scope["query_string"].decode("latin-1")).items()}
+    else:
+        data = await read_json(receive)
+    if not isinstance(data, dict) or "home_team" not in data or "away_team" not in data:
+        raise HTTPError(400, "Both 'home_team' and 'away_team' must be provided.")
+
+    home_team, away_team = data.get("home_team"), data.get("away_team")
+    if not isinstance(home_team, str) or not isinstance(away_team, str):
+        raise HTTPError(400, "'home_team' and 'away_team' must be team names.")
+    if home_team == away_team:
+        raise HTTPError(400, "'home_team' and 'away_team' must differ.")
+
+    current = await current_state()
+    key = ("predict", (home_team, away_team), current.version)
+    with stage_seconds.time("cache_lookup"):
+        entry = response_cache.get(key)
+    if entry is None:
+        with stage_seconds.time("lookup"):
+            home_row = current.team_index.rows.get(home_team)
+            away_row = current.team_index.rows.get(away_team)
+        if home_row is None or away_row is None:
+            raise HTTPError(400, "One or both teams not found in team_data.csv")
+
+        try:
+            probabilities = await batcher.predict(current, home_row, away_row)
+        except Exception as e:
+            raise HTTPError(500, f"Prediction failed: {str(e)}")
+        with stage_seconds.time("serialize"):
+            entry = response_cache.put(key, serialize({**format_probabilities(probabilities), "version": current.version}))
+    await send_cached(send, scope, current, entry)
+
+async def get_metrics(scope, receive, send):
+    body = metrics_registry.render().encode()
+    await send_response(send, 200, body, [(b"content-type", metrics_registry.CONTENT_TYPE.encode())])
+
+ROUTES = {
+    "/health": (health, {"GET"}),
+    "/teams": (get_teams, {"GET"}),
+    "/predict": (predict, {"GET", "POST"}),
+    "/metrics": (get_metrics, {"GET"}),
+}
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def app(scope, receive, send):
+    """ASGI entry point serving /health, /teams, /predict and /metrics."""
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+
+    start = time.perf_counter()
+    status = 500
+
+    async def send_and_record(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        await send(message)
+
+    handler, methods = ROUTES.get(scope["path"], (None, set()))
+    endpoint = scope["path"] if handler is not None else "unmatched"
+    try:
+        await route(scope, receive, send_and_record, handler, methods)
+    finally:
+        request_seconds.observe(time.perf_counter() - start, endpoint, scope["method"], status)
+
+async def route(scope, receive, send, handler, methods):
+    """Dispatch a request to its handler, answering errors as JSON."""
+    try:
+        if handler is None:
+            raise HTTPError(404, f"{scope['path']} is not served in async mode.")
+        if scope["method"] == "OPTIONS":
+            return await send_response(send, 204, b"", [
+                (b"access-control-allow-methods", ", ".join(sorted(methods)).encode()),
+                (b"access-control-allow-headers", b"Content-Type"),
+            ])
+        if scope["method"] not in methods:
+            raise HTTPError(405, f"{scope['method']} is not allowed on {scope['path']}.")
+        await handler(scope, receive, send)
+    except HTTPError as e:
+        await send_response(send, e.status, serialize({"error": e.message}), [(b"content-type", b"application/json")])
+
+if __name__ == "__main__":
+    import uvicorn
+
+    logging.info(f"Coalescing /predict into batches of up to {MAX_BATCH_SIZE} within {MAX_WAIT_MS}ms")
+    uvicorn.run(app, host=BIND_HOST, port=BIND_PORT)
@@ -0,0 +1,198 @@
+import os
+import time
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from xgboost import XGBClassifier
+from features import FEATURE_COLUMNS, ROLLING_STATS
+from storage import DEFAULT_COMPETITION, aggregated_file, list_partitions
+from team_registry import TeamRegistry
+from data_preprocessor import MATCH_DATA_COLS, load_data, clean_data, build_features, merge_match_data
+from model_trainer import XGB_PARAMS, CLASS_LABELS
+
+# Logging Configuration
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# File constants
+BACKTEST_PREDICTIONS_FILE = "backtest_predictions.csv"
+BACKTEST_RESULTS_FILE = "backtest_results.csv"
+BACKTEST_CALIBRATION_FILE = "backtest_calibration.csv"
+
+# Matchweeks each model is used for before the next retrain, and fixtures needed to train the first model
+RETRAIN_WEEKS = 4
+MIN_TRAINING_ROWS = 200
+
+# Equal-width predicted-probability bins in the calibration table
+CALIBRATION_BINS = 10
+
+# Windows trained at once; each fit gets an equal share of the remaining cores
+BACKTEST_WORKERS = int(os.environ.get("BACKTEST_WORKERS", os.cpu_count() or 1))
+
+# Probability columns of the predictions, in CLASS_LABELS order
+PROBABILITY_COLS = ["Away_Win", "Draw", "Home_Win"]
+
+def point_in_time_features(competitions, seasons=None):
+    """Every fixture with its features as of kick-off, in date order.
+
+    Each partition's match data is passed through build_features once. Its rolling and
+    cumulative stats only use earlier matches, so every row holds what was known before the
+    match. Team codes come from the team registry, which is read but not saved.
+    """
+    registry = TeamRegistry.load()
+    frames = []
+    for competition, season in list_partitions(competitions, seasons):
+        match_data = load_data(aggregated_file(competition, season), MATCH_DATA_COLS)
+        if match_data is None:
+            continue
+        match_data = clean_data(match_data, registry)
+        match_features, _ = build_features(match_data, ROLLING_STATS)
+
+        home_data = match_features[match_features["Venue"] == 0]
+        away_data = match_features[match_features["Venue"] == 1]
+        fixtures = merge_match_data(home_data, away_data, ROLLING_STATS)
+        fixtures.insert(1, "Competition", competition)
+        fixtures.insert(2, "Season", season)
+        frames.append(fixtures)
+
+    if not frames:
+        return None
+    fixtures = pd.concat(frames, ignore_index=True).sort_values("Date", kind="stable").reset_index(drop=True)
+    fixtures["Matchweek"] = fixtures["Date"].dt.to_period("W").dt.start_time
+    return fixtures
+
+def backtest_windows(matchweeks, retrain_weeks=RETRAIN_WEEKS, min_training_rows=MIN_TRAINING_ROWS):
+    """Split date-sorted rows into expanding windows of (train_end, score_end) row positions.
+
+    Each window's model trains on rows [0, train_end), every fixture before its first
+    matchweek, and scores rows [train_end, score_end), the next `retrain_weeks` matchweeks
+    with fixtures. Breaks between seasons don't count as matchweeks.
+    """
+    week_starts = np.flatnonzero(np.r_[True, matchweeks[1:] != matchweeks[:-1]])
+    week_starts = week_starts[week_starts >= min_training_rows]
+    retrain_starts = week_starts[::retrain_weeks]
+    return list(zip(retrain_starts, np.r_[retrain_starts[1:], len(matchweeks)]))
+
+def run_window(params, features, target, train_end, score_end, n_threads):
+    """Train on the rows before `train_end` and predict those up to `score_end` in one batch."""
+    model = XGBClassifier(**params, n_jobs=n_threads)
+    model.fit(features[:train_end], target[:train_end])
+    return model.predict_proba(features[train_end:score_end])
+
+def run_backtest(fixtures, params=XGB_PARAMS, retrain_weeks=RETRAIN_WEEKS, min_training_rows=MIN_TRAINING_ROWS, n_workers=BACKTEST_WORKERS):
+    """Predict every fixture after the first `min_training_rows` with a model trained only on earlier fixtures.
+
+    Windows are trained in parallel, largest first so the longest fits don't finish last.
+    Returns the scored fixtures with their class probabilities and the date each model was trained through.
+    """
+    windows = backtest_windows(fixtures["Matchweek"].to_numpy(), retrain_weeks, min_training_rows)
+    if not windows:
+        return None
+
+    features = fixtures[FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+    target = fixtures["Match_Result"].to_numpy(dtype=int)
+    n_threads = max(1, (os.cpu_count() or 1) // n_workers)
+    logging.info(f"Backtesting {windows[-1][1] - windows[0][0]} fixtures in {len(windows)} windows with {n_workers} workers x {n_threads} threads")
+
+    order = sorted(range(len(windows)), key=lambda i: -windows[i][0])
+    probabilities = Parallel(n_jobs=n_workers)(
+        delayed(run_window)(params, features, target, *windows[i], n_threads) for i in order
+    )
+    probabilities = dict(zip(order, probabilities))
+
+    scored = fixtures.iloc[windows[0][0]:].copy()
+    scored[PROBABILITY_COLS] = np.concatenate([probabilities[i] for i in range(len(windows))])
+    scored["Trained_Through"] = np.concatenate([
+        np.repeat(fixtures["Date"].iloc[train_end - 1], score_end - train_end) for train_end, score_end in windows
+    ])
+    return scored
+
+def fixture_scores(scored):
+    """Per-fixture logloss, Brier score (summed over the three outcomes) and whether the most likely outcome happened."""
+    probabilities = scored[PROBABILITY_COLS].to_numpy(dtype=float)
+    results = scored["Match_Result"].to_numpy(dtype=int)
+    outcomes = np.eye(len(CLASS_LABELS))[results]
+    return pd.DataFrame({
+        "logloss": -np.log(np.clip((probabilities * outcomes).sum(axis=1), 1e-15, 1)),
+        "brier": ((probabilities - outcomes) ** 2).sum(axis=1),
+        "accuracy": probabilities.argmax(axis=1) == results,
+    }, index=scored.index)
+
+def scores_over_time(scored):
+    """Fixtures, logloss, Brier score and accuracy per matchweek, with running totals since the start of the backtest."""
+    scores = fixture_scores(scored)
+    keys = [scored["Competition"], scored["Season"], scored["Matchweek"]]
+    results = scores.groupby(keys).agg(fixtures=("logloss", "size"), logloss=("logloss", "mean"), brier=("brier", "mean"), accuracy=("accuracy", "mean"))
+
+    sums = scores.groupby(keys).sum()
+    running = sums.groupby(level="Competition").cumsum()
+    running_fixtures = results["fixtures"].groupby(level="Competition").cumsum()
+    for metric in ("logloss", "brier", "accuracy"):
+        results[f"running_{metric}"] = running[metric] / running_fixtures
+    return results.reset_index()
+
+def calibration_table(scored, n_bins=CALIBRATION_BINS):
+    """For each outcome, the mean predicted probability against how often it happened, per probability bin."""
+    rows = []
+    for label, col in zip(CLASS_LABELS, PROBABILITY_COLS):
+        predicted = scored[col].to_numpy(dtype=float)
+        happened = scored["Match_Result"].to_numpy() == label
+        bins = np.minimum((predicted * n_bins).astype(int), n_bins - 1)
+        counts = np.bincount(bins, minlength=n_bins)
+        for i in np.flatnonzero(counts):
+            rows.append({
+                "outcome": col,
+                "bin": f"{i / n_bins:.1f}-{(i + 1) / n_bins:.1f}",
+                "fixtures": counts[i],
+                "predicted": predicted[bins == i].mean(),
+                "observed": happened[bins == i].mean(),
+            })
+    return pd.DataFrame(rows)
+
+def backtest(competitions, seasons=None, retrain_weeks=RETRAIN_WEEKS, min_training_rows=MIN_TRAINING_ROWS, workers=BACKTEST_WORKERS):
+    """Backtest the model over the selected partitions and save predictions, scores over time and calibration. Returns False if there was nothing to score."""
+    start = time.perf_counter()
+    fixtures = point_in_time_features(competitions, seasons)
+    if fixtures is None:
+        logging.error(f"No match data found for {', '.join(competitions)}. Run webscraper.py first.")
+        return False
+    logging.info(f"Built point-in-time features for {len(fixtures)} fixtures in {time.perf_counter() - start:.1f}s")
+
+    scored = run_backtest(fixtures, XGB_PARAMS, retrain_weeks, min_training_rows, workers)
+    if scored is None:
+        logging.error(f"Only {len(fixtures)} fixtures with features; at least {min_training_rows} are needed before the first model.")
+        return False
+
+    scored.to_csv(BACKTEST_PREDICTIONS_FILE, index=False)
+    results = scores_over_time(scored)
+    results.to_csv(BACKTEST_RESULTS_FILE, index=False)
+    calibration = calibration_table(scored)
+    calibration.to_csv(BACKTEST_CALIBRATION_FILE, index=False)
+
+    by_season = fixture_scores(scored).groupby([scored["Competition"], scored["Season"]]).mean()
+    overall = fixture_scores(scored).mean()
+    logging.info(f"Scores by season:\n{by_season.round(4).to_string()}")
+    logging.info(f"Calibration:\n{calibration.round(3).to_string(index=False)}")
+    logging.info(
+        f"Backtested {len(scored)} fixtures in {time.perf_counter() - start:.1f}s: logloss {overall['logloss']:.4f}, "
+        f"Brier {overall['brier']:.4f}, accuracy {overall['accuracy']:.2f}"
+    )
+    logging.info(f"Saved {BACKTEST_PREDICTIONS_FILE}, {BACKTEST_RESULTS_FILE} and {BACKTEST_CALIBRATION_FILE}")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay past matchweeks with models trained only on earlier fixtures, and score the predictions.")
+    parser.add_argument("--competitions", nargs="+", default=[DEFAULT_COMPETITION])
+    parser.add_argument("--seasons", nargs="+", help="Seasons to replay, e.g. 2023-2024 (default: all on disk)")
+    parser.add_argument("--retrain-weeks", type=int, default=RETRAIN_WEEKS, help="Matchweeks each model predicts before the next retrain")
+    parser.add_argument("--min-training-rows", type=int, default=MIN_TRAINING_ROWS, help="Fixtures to train the first model on")
+    parser.add_argument("--workers", type=int, default=BACKTEST_WORKERS, help="Windows to train in parallel")
+    args = parser.parse_args()
+    if args.retrain_weeks < 1:
+        parser.error("--retrain-weeks must be at least 1")
+
+    backtest(args.competitions, args.seasons, args.retrain_weeks, args.min_training_rows, args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Time to answer a burst of concurrent /predict requests in async mode, with and without coalescing.
+
+Requests are sent straight to the ASGI app, so only the handler and model work are timed.
+The model runs per request (PRECOMPUTE_PREDICTIONS=0) and the response cache is cleared
+before each burst. Run from the backend folder:
+    python -m benchmarks.coalescing [--requests 256] [--fixtures 8] [--repeats 5]
+"""
+import os
+import time
+import asyncio
+import argparse
+import statistics
+from urllib.parse import urlencode
+
+os.environ["PRECOMPUTE_PREDICTIONS"] = "0"
+os.environ["WATCH_ARTIFACTS"] = "0"
+
+import async_predictor
+from async_predictor import PredictionBatcher
+from predictor import response_cache
+
+class UncoalescedBatcher:
+    """One predict_rows call per request, as the synchronous handler does."""
+
+    async def predict(self, current, home_row, away_row):
+        probabilities = await asyncio.get_running_loop().run_in_executor(None, current.predict_rows, [home_row], [away_row])
+        return probabilities[0]
+
+async def request(path):
+    """Send one GET through the ASGI app and return the response status."""
+    path, _, query = path.partition("?")
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": query.encode(), "headers": []}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await async_predictor.app(scope, receive, send)
+    return messages[0]["status"]
+
+async def burst(paths):
+    """Seconds to answer every path concurrently."""
+    response_cache.clear()
+    start = time.perf_counter()
+    statuses = await asyncio.gather(*(request(path) for path in paths))
+    assert all(status == 200 for status in statuses)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=256, help="Concurrent requests per burst")
+    parser.add_argument("--fixtures", type=int, default=8, help="Distinct fixtures in the hot-fixture burst")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    teams = list(async_predictor.predictor.state.team_index.rows)
+    pairings = [(home, away) for home in teams for away in teams if home != away]
+    distinct = [pairings[i % len(pairings)] for i in range(args.requests)]
+    hot = [pairings[i % args.fixtures] for i in range(args.requests)]
+
+    modes = {
+        "uncoalesced": UncoalescedBatcher(),
+        "max wait 0ms": PredictionBatcher(async_predictor.MAX_BATCH_SIZE, 0),
+        f"max wait {async_predictor.MAX_WAIT_MS:g}ms": PredictionBatcher(async_predictor.MAX_BATCH_SIZE, async_predictor.MAX_WAIT_MS / 1000),
+    }
+
+    print(f"{args.requests} concurrent requests, max batch size {async_predictor.MAX_BATCH_SIZE}, "
+          f"backend {async_predictor.predictor.MODEL_BACKEND}, median of {args.repeats} bursts")
+    print(f"{'mode':<18}{'distinct (ms)':>15}{'model calls':>13}{f'{args.fixtures} fixtures (ms)':>18}{'model calls':>13}")
+    for mode, batcher in modes.items():
+        async_predictor.batcher = batcher
+        row = f"{mode:<18}"
+        for fixtures, width in ((distinct, 15), (hot, 18)):
+            paths = [f"/predict?{urlencode({'home_team': home, 'away_team': away})}" for home, away in fixtures]
+            batches_before = getattr(batcher, "batches", 0)
+            elapsed = statistics.median(asyncio.run(burst(paths)) for _ in range(args.repeats)) * 1000
+            # The uncoalesced handler calls the model once per request
+            calls = (batcher.batches - batches_before) / args.repeats if hasattr(batcher, "batches") else len(paths)
+            row += f"{elapsed:>{width}.1f}{calls:>13g}"
+        print(row)
+
+if __name__ == "__main__":
+    main()
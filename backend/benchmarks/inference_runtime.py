@@ -0,0 +1,102 @@
+"""Import time, load time, worker RSS and prediction latency for each model backend in inference.py.
+
+Each backend is measured in a freshly spawned process, so its imports and memory are
+not shared with the others. Predictions are compared against the pickled sklearn model.
+Run from the backend folder:
+    python -m benchmarks.inference_runtime [--repeats 200]
+"""
+import sys
+import time
+import argparse
+import importlib
+import statistics
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Third-party modules each backend needs before it can load the model
+BACKEND_IMPORTS = {"sklearn": ["joblib", "sklearn", "xgboost"], "booster": ["xgboost"], "numpy": []}
+
+def read_status_kib(field):
+    """Read a memory field (e.g. VmRSS) from /proc/self/status, in KiB (Linux only)."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+def measure_backend(backend, features, repeats):
+    """Load one backend and time its predictions. Runs in a spawned process."""
+    baseline_kib = read_status_kib("VmRSS")
+    start = time.perf_counter()
+    for module in BACKEND_IMPORTS[backend]:
+        importlib.import_module(module)
+    import inference
+    import_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    model = inference.load_model(backend)
+    load_ms = (time.perf_counter() - start) * 1000
+    rss_mib = read_status_kib("VmRSS") / 1024
+
+    single_us = []
+    for i in range(repeats):
+        row = features[i % len(features)][np.newaxis, :]
+        start = time.perf_counter()
+        model.predict_proba(row)
+        single_us.append((time.perf_counter() - start) * 1e6)
+
+    batch_ms = []
+    for _ in range(max(1, repeats // 20)):
+        start = time.perf_counter()
+        probabilities = model.predict_proba(features)
+        batch_ms.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "import_ms": import_ms,
+        "load_ms": load_ms,
+        "rss_mib": rss_mib,
+        "rss_added_mib": rss_mib - baseline_kib / 1024,
+        "single_us": statistics.median(single_us),
+        "batch_ms": statistics.median(batch_ms),
+        "loaded": sorted(name for name in ("pandas", "sklearn", "xgboost") if name in sys.modules),
+        "probabilities": np.asarray(probabilities, dtype=np.float64),
+    }
+
+def load_pair_features():
+    """Model inputs for every home/away pairing in team_data, built as the predictor does."""
+    # Imported here so spawned workers don't pay for them before measuring
+    from features import TEAM_FEATURE_COLS
+    from storage import read_table
+    from data_preprocessor import TEAM_DATA_FILE
+
+    team_features = read_table(TEAM_DATA_FILE, columns=["Team_Code"] + TEAM_FEATURE_COLS).to_numpy(dtype=np.float32)
+    n_teams = len(team_features)
+    home = team_features[np.repeat(np.arange(n_teams), n_teams)]
+    away = team_features[np.tile(np.arange(n_teams), n_teams)]
+    return np.hstack([home[:, :1], away[:, :1], home[:, 1:], away[:, 1:]])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    import inference
+    features = load_pair_features()
+    results = {}
+    for backend in inference.BACKENDS:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            results[backend] = executor.submit(measure_backend, backend, features, args.repeats).result()
+
+    reference = results["sklearn"]["probabilities"]
+    print(f"{len(features)} pairings; latency is the median of {args.repeats} single-row calls")
+    print(f"{'backend':<10}{'import (ms)':>12}{'load (ms)':>11}{'RSS (MiB)':>11}{'+RSS (MiB)':>12}"
+          f"{'1 row (us)':>12}{'all (ms)':>10}{'max diff':>11}  modules loaded")
+    for backend, result in results.items():
+        difference = np.abs(result["probabilities"] - reference).max()
+        print(f"{backend:<10}{result['import_ms']:>12.0f}{result['load_ms']:>11.1f}{result['rss_mib']:>11.1f}"
+              f"{result['rss_added_mib']:>12.1f}{result['single_us']:>12.1f}{result['batch_ms']:>10.2f}"
+              f"{difference:>11.1e}  {', '.join(result['loaded']) or '-'}")
+
+if __name__ == "__main__":
+    main()
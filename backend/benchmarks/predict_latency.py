@@ -0,0 +1,101 @@
+"""Per-request latency of the /predict and /teams handlers, before and after the team index.
+
+Run from the backend folder:
+    python -m benchmarks.predict_latency
+"""
+import timeit
+import numpy as np
+import pandas as pd
+import predictor
+
+REPEATS = 5
+NUMBER = 200
+
+def legacy_pair_features(team_data, home_team, away_team):
+    """Feature construction as done by /predict before the team index existed."""
+    home_team_data = team_data.loc[team_data["Team_Name"] == home_team]
+    away_team_data = team_data.loc[team_data["Team_Name"] == away_team]
+
+    rolling_avg_cols = [
+        "GF_rolling", "GA_rolling", "xG_rolling", "xGA_rolling",
+        "Poss_rolling", "Sh_rolling", "SoT_rolling", "FK_rolling", "PKatt_rolling"
+    ]
+    cumulative_cols = ["GD", "Win%", "Draw%", "Loss%"]
+
+    features_dict = {
+        "Home_Team_code": int(home_team_data["Team_Code"].values[0]),
+        "Away_Team_code": int(away_team_data["Team_Code"].values[0])
+    }
+    for side, side_data in (("home", home_team_data), ("away", away_team_data)):
+        rolling_avg = side_data[rolling_avg_cols].astype(float).values[0]
+        for i, col in enumerate(rolling_avg_cols):
+            features_dict[f"{col}_{side}"] = rolling_avg[i]
+    for side, side_data in (("home", home_team_data), ("away", away_team_data)):
+        cumulative = side_data[cumulative_cols].astype(float).values[0]
+        for i, col in enumerate(cumulative_cols):
+            features_dict[f"{col}_{side}"] = cumulative[i]
+
+    # Column order as the dict was built in the original handler
+    order = ["Home_Team_code", "Away_Team_code"]
+    order += [f"{col}_home" for col in rolling_avg_cols] + [f"{col}_home" for col in cumulative_cols]
+    order += [f"{col}_away" for col in rolling_avg_cols] + [f"{col}_away" for col in cumulative_cols]
+    return pd.DataFrame([features_dict])[order]
+
+def legacy_teams_payload(team_data):
+    """The /teams payload as rebuilt from iterrows() on every request."""
+    return [
+        {
+            "team_name": row["Team_Name"],
+            "logo_url": row["Logo"],
+            "wins": int(row["Wins"]),
+            "draws": int(row["Draws"]),
+            "losses": int(row["Losses"]),
+            "goal_differential": int(row["GD"]),
+            "last_5_matches": []
+        }
+        for _, row in team_data.iterrows()
+    ]
+
+def best_time_us(func):
+    """Best-of-REPEATS mean time per call, in microseconds."""
+    return min(timeit.repeat(func, repeat=REPEATS, number=NUMBER)) / NUMBER * 1e6
+
+def main():
+    team_data = predictor.load_team_data()
+    team_index = predictor.state.team_index
+    model = predictor.state.model
+    home_team, away_team = team_data["Team_Name"].iloc[0], team_data["Team_Name"].iloc[-1]
+    home_row, away_row = team_index.rows[home_team], team_index.rows[away_team]
+
+    # Both paths must hand the model the same inputs
+    np.testing.assert_allclose(
+        legacy_pair_features(team_data, home_team, away_team).to_numpy(dtype=np.float32),
+        team_index.pair_features(home_row, away_row)
+    )
+
+    client = predictor.app.test_client()
+    payload = {"home_team": home_team, "away_team": away_team}
+
+    results = [
+        ("feature build",
+         best_time_us(lambda: legacy_pair_features(team_data, home_team, away_team)),
+         best_time_us(lambda: team_index.pair_features(team_index.rows[home_team], team_index.rows[away_team]))),
+        ("feature build + predict_proba",
+         best_time_us(lambda: model.predict_proba(legacy_pair_features(team_data, home_team, away_team))),
+         best_time_us(lambda: model.predict_proba(team_index.pair_features(home_row, away_row)))),
+        ("/teams payload",
+         best_time_us(lambda: legacy_teams_payload(team_data)),
+         best_time_us(lambda: team_index.teams)),
+    ]
+
+    print(f"{'stage':<32}{'before (us)':>14}{'after (us)':>14}{'speedup':>10}")
+    for name, before, after in results:
+        print(f"{name:<32}{before:>14.1f}{after:>14.1f}{before / after:>9.1f}x")
+
+    print()
+    print(f"{'endpoint (test client)':<32}{'after (us)':>14}")
+    print(f"{'POST /predict':<32}{best_time_us(lambda: client.post('/predict', json=payload)):>14.1f}")
+    print(f"{'GET /teams':<32}{best_time_us(lambda: client.get('/teams')):>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""CPU time and peak memory (Linux) per team for parsing saved fbref pages, old path vs single-pass lxml.
+
+Pages come from the scraper's page cache, so scrape once (or copy a cache directory
+over) before running. Run from the backend folder:
+    python -m benchmarks.scrape_parsing [--cache-dir "Data/Page Cache"] [--repeats 5]
+"""
+import io
+import os
+import json
+import time
+import argparse
+import statistics
+import multiprocessing
+import pandas as pd
+from bs4 import BeautifulSoup
+from concurrent.futures import ProcessPoolExecutor
+import webscraper
+from page_cache import PageCache
+
+def legacy_parse(team_html, shooting_html):
+    """Parsing as done by scrape_team_data before the single-pass parser."""
+    match_dataframe = pd.read_html(io.StringIO(team_html), match="Scores & Fixtures")[0]
+    soup = BeautifulSoup(team_html, "html.parser")
+
+    image_tag = soup.find("img", class_="teamlogo")
+    team_logo_url = image_tag["src"] if image_tag else ""
+
+    team_data_links = [l.get("href") for l in soup.find_all('a')]
+    shooting_links = [l for l in team_data_links if l and webscraper.SHOOTING_URL_PART in l]
+
+    shooting_dataframe = pd.read_html(io.StringIO(shooting_html), match="Shooting")[0]
+    shooting_dataframe.columns = shooting_dataframe.columns.droplevel()
+    return match_dataframe, team_logo_url, shooting_links[0], shooting_dataframe
+
+def single_pass_parse(team_html, shooting_html):
+    """Parsing through webscraper's single-pass lxml parser."""
+    match_dataframe, team_logo_url, shooting_link = webscraper.parse_team_page(team_html)
+    return match_dataframe, team_logo_url, shooting_link, webscraper.parse_shooting_page(shooting_html)
+
+PARSERS = {"legacy": legacy_parse, "single_pass": single_pass_parse}
+
+def load_cached_teams(cache_dir):
+    """Return {team page URL: (team html, shooting html)} for every team with both pages cached."""
+    cache = PageCache(cache_dir, ttl=float("inf"), max_bytes=float("inf"), replay=True)
+    teams = {}
+    for file_name in sorted(os.listdir(cache_dir)):
+        if not file_name.endswith(".json"):
+            continue
+        with open(os.path.join(cache_dir, file_name), encoding="utf-8") as f:
+            meta = json.load(f)
+        shooting_url = meta.get("extras", {}).get("shooting_url")
+        shooting_meta = cache.get_meta(shooting_url) if shooting_url else None
+        if shooting_meta is not None:
+            teams[meta["url"]] = (cache.read(meta["url"], meta).text, cache.read(shooting_url, shooting_meta).text)
+    return teams
+
+def read_status_kib(field):
+    """Read a memory field (e.g. VmRSS, VmHWM) from /proc/self/status, in KiB."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+def measure_peak_memory(parser_name, team_html, shooting_html):
+    """Run one parse and return how far peak RSS rose above the starting RSS, in MiB (Linux only).
+
+    Called in a freshly spawned process so memory freed by earlier parses can't be reused.
+    """
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")  # Reset VmHWM (peak RSS) to the current RSS
+    baseline = read_status_kib("VmRSS")
+    PARSERS[parser_name](team_html, shooting_html)
+    return (read_status_kib("VmHWM") - baseline) / 1024
+
+def measure_cpu_time(parser, team_html, shooting_html, repeats):
+    """Median CPU time of a parse, in milliseconds."""
+    timings = []
+    for _ in range(repeats):
+        start = time.process_time()
+        parser(team_html, shooting_html)
+        timings.append((time.process_time() - start) * 1000)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cache-dir", default=webscraper.PAGE_CACHE_DIR)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    teams = load_cached_teams(args.cache_dir)
+    if not teams:
+        print(f"No cached team/shooting page pairs found in {args.cache_dir}. Run the scraper first.")
+        return
+
+    print(f"{'team':<32}{'parser':<14}{'CPU (ms)':>10}{'peak RSS (MiB)':>16}")
+    totals = {name: [0.0, 0.0] for name in PARSERS}
+    for team_url, (team_html, shooting_html) in teams.items():
+        for name, parse in PARSERS.items():
+            cpu_ms = measure_cpu_time(parse, team_html, shooting_html, args.repeats)
+            # A spawned process starts with a small peak RSS, unlike a fork of this one
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                peak_mib = executor.submit(measure_peak_memory, name, team_html, shooting_html).result()
+            totals[name][0] += cpu_ms
+            totals[name][1] += peak_mib
+            print(f"{webscraper.team_name_from_url(team_url)[:31]:<32}{name:<14}{cpu_ms:>10.1f}{peak_mib:>16.1f}")
+
+    print()
+    for name, (cpu_ms, peak_mib) in totals.items():
+        print(f"{'mean per team':<32}{name:<14}{cpu_ms / len(teams):>10.1f}{peak_mib / len(teams):>16.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Wall time of a full-season Monte Carlo run (every fixture, no results yet) as worker processes are added.
+
+Fixtures are scored once up front, so only sampling, tables and ranking are timed. Run from the backend folder:
+    python -m benchmarks.season_simulation [--simulations 100000] [--max-workers 4]
+"""
+import os
+import time
+import argparse
+
+os.environ["WATCH_ARTIFACTS"] = "0"
+
+import predictor
+import simulator
+from storage import DEFAULT_COMPETITION
+
+def worker_counts(max_workers):
+    """1, 2, 4, ... up to max_workers, always including max_workers."""
+    counts = [1]
+    while counts[-1] * 2 < max_workers:
+        counts.append(counts[-1] * 2)
+    if max_workers > 1:
+        counts.append(max_workers)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--competition", default=DEFAULT_COMPETITION)
+    parser.add_argument("--simulations", type=int, default=simulator.DEFAULT_SIMULATIONS)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    table = simulator.SeasonTable.load(args.competition, simulator.latest_season(args.competition)).reset()
+    fixtures = table.remaining_fixtures()
+    probabilities = simulator.fixture_probabilities(predictor.state, fixtures)
+
+    print(f"{len(table.teams)} teams, {len(fixtures)} fixtures, {args.simulations} seasons, {os.cpu_count()} cores")
+    print(f"{'workers':>8}{'wall (s)':>10}{'seasons/s':>12}")
+    for n_workers in worker_counts(args.max_workers):
+        start = time.perf_counter()
+        simulator.simulate(table, fixtures, probabilities, args.simulations, seed=0, workers=n_workers)
+        elapsed = time.perf_counter() - start
+        print(f"{n_workers:>8}{elapsed:>10.2f}{args.simulations / elapsed:>12.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Memory and throughput of the pre-forked server (serve.py) as workers are added.
+
+For each worker count a fresh server is started. The benchmark reports total PSS, i.e.
+memory with shared pages split between the processes sharing them, and each worker's
+private memory. It then drives /predict and /teams from several client processes for a
+fixed time. Linux only (reads /proc). Run from the backend folder:
+    python -m benchmarks.serve_scaling [--max-workers 4] [--clients 8] [--seconds 5]
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+import http.client
+import multiprocessing
+import urllib.request
+import urllib.error
+from concurrent.futures import ProcessPoolExecutor
+
+# Give up on a server that isn't ready after this many seconds
+STARTUP_TIMEOUT = 60
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def worker_counts(max_workers):
+    """1, 2, 4, ... up to max_workers, always including max_workers."""
+    counts = [1]
+    while counts[-1] * 2 < max_workers:
+        counts.append(counts[-1] * 2)
+    if max_workers > 1:
+        counts.append(max_workers)
+    return counts
+
+def memory_kib(pid):
+    """PSS and private memory of a process from /proc/<pid>/smaps_rollup, in KiB."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return fields["Pss"], fields["Private_Clean"] + fields["Private_Dirty"]
+
+def child_pids(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+def wait_until_ready(base_url, server):
+    """Poll /health until the server reports ready. Returns False if it exits or times out."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < STARTUP_TIMEOUT and server.poll() is None:
+        try:
+            with urllib.request.urlopen(f"{base_url}/health", timeout=1) as response:
+                if json.load(response)["ready"]:
+                    return True
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            pass
+        time.sleep(0.05)
+    return False
+
+def run_client(port, method, path, body, seconds):
+    """Send requests over one keep-alive connection for `seconds`. Returns the number of successful responses."""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    headers = {"Content-Type": "application/json"}
+    completed = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        completed += response.status == 200
+    connection.close()
+    return completed
+
+def measure_throughput(port, method, path, body, clients, seconds):
+    """Requests per second served to `clients` concurrent client processes."""
+    with ProcessPoolExecutor(max_workers=clients) as executor:
+        futures = [executor.submit(run_client, port, method, path, body, seconds) for _ in range(clients)]
+        return sum(future.result() for future in futures) / seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    # Any two teams will do for the /predict load
+    from storage import read_table
+    from data_preprocessor import TEAM_DATA_FILE
+    home_team, away_team = read_table(TEAM_DATA_FILE, columns=["Team_Name"])["Team_Name"][:2]
+    predict_body = json.dumps({"home_team": home_team, "away_team": away_team})
+
+    print(f"{args.clients} client processes, {args.seconds:.0f}s per endpoint, {os.cpu_count()} cores")
+    print(f"{'workers':>8}{'total PSS (MiB)':>17}{'private/worker (MiB)':>22}{'/predict req/s':>16}{'/teams req/s':>14}")
+    for n_workers in worker_counts(args.max_workers):
+        port = free_port()
+        env = {**os.environ, "SERVER_BIND": f"127.0.0.1:{port}", "SERVER_WORKERS": str(n_workers)}
+        server = subprocess.Popen([sys.executable, "serve.py"], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not wait_until_ready(f"http://127.0.0.1:{port}", server):
+                print(f"{n_workers:>8}  server did not become ready")
+                continue
+
+            predict_rps = measure_throughput(port, "POST", "/predict", predict_body, args.clients, args.seconds)
+            teams_rps = measure_throughput(port, "GET", "/teams", None, args.clients, args.seconds)
+
+            # Measured after serving, once every worker has touched the data it uses
+            workers = child_pids(server.pid)
+            total_pss = sum(memory_kib(pid)[0] for pid in [server.pid] + workers) / 1024
+            private_per_worker = sum(memory_kib(pid)[1] for pid in workers) / len(workers) / 1024
+            print(f"{n_workers:>8}{total_pss:>17.1f}{private_per_worker:>22.1f}{predict_rps:>16.0f}{teams_rps:>14.0f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Prediction server cold start: time to first response, time until predictions are served, and import time by package.
+
+Each mode starts a fresh server process:
+  eager       - everything loads before the server starts (default)
+  fast, cold  - FAST_STARTUP=1 without a serving artifact, which is rebuilt during warm-up
+  fast, warm  - FAST_STARTUP=1 with an up-to-date serving artifact to memory-map
+Run from the backend folder:
+    python -m benchmarks.startup [--top 12]
+"""
+import os
+import re
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+import urllib.request
+import urllib.error
+from collections import defaultdict
+from serving_artifact import SERVING_ARTIFACT_FILE
+from storage import read_table
+from data_preprocessor import TEAM_DATA_FILE
+
+MODES = {
+    "eager": {"FAST_STARTUP": "0"},
+    "fast, cold": {"FAST_STARTUP": "1"},
+    "fast, warm": {"FAST_STARTUP": "1"},
+}
+
+# Give up on a server that hasn't answered after this many seconds
+STARTUP_TIMEOUT = 60
+
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def request_ok(url, payload=None):
+    """Whether a request gets a 200 response."""
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=1) as response:
+            return response.status == 200
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return False
+
+def time_server_start(env, home_team, away_team):
+    """Start a server and return (seconds to the first /health response, seconds to the first /predict response)."""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    command = [sys.executable, "-c", f"import predictor; predictor.app.run(port={port}, use_reloader=False)"]
+
+    start = time.perf_counter()
+    server = subprocess.Popen(command, env={**os.environ, "WATCH_ARTIFACTS": "0", **env},
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        first_response = first_prediction = None
+        while first_prediction is None and time.perf_counter() - start < STARTUP_TIMEOUT:
+            if first_response is None and request_ok(f"{base_url}/health"):
+                first_response = time.perf_counter() - start
+            if first_response is not None and request_ok(f"{base_url}/predict", {"home_team": home_team, "away_team": away_team}):
+                first_prediction = time.perf_counter() - start
+            time.sleep(0.005)
+        return first_response, first_prediction
+    finally:
+        server.terminate()
+        server.wait()
+
+def format_seconds(value):
+    return f"{value:.2f}" if value is not None else "timeout"
+
+def import_times(env):
+    """Total self import time per top-level package when importing predictor, in milliseconds."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import predictor"],
+                            env={**os.environ, "WATCH_ARTIFACTS": "0", **env}, capture_output=True, text=True)
+    totals = defaultdict(float)
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            totals[match.group(4).split(".")[0]] += int(match.group(1)) / 1000
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=12, help="Packages to list in the import breakdown")
+    args = parser.parse_args()
+
+    # Any two teams will do for the /predict probe
+    teams = list(read_table(TEAM_DATA_FILE, columns=["Team_Name"])["Team_Name"][:2])
+
+    print(f"{'mode':<14}{'first response (s)':>20}{'first prediction (s)':>22}")
+    for mode, env in MODES.items():
+        if mode == "fast, cold" and os.path.exists(SERVING_ARTIFACT_FILE):
+            os.remove(SERVING_ARTIFACT_FILE)
+        first_response, first_prediction = time_server_start(env, *teams)
+        print(f"{mode:<14}{format_seconds(first_response):>20}{format_seconds(first_prediction):>22}")
+
+    print("\nImport time of predictor by package (ms, self time summed over submodules):")
+    eager, fast = import_times(MODES["eager"]), import_times(MODES["fast, warm"])
+    print(f"{'package':<20}{'eager':>10}{'fast':>10}")
+    for package in sorted(eager, key=eager.get, reverse=True)[:args.top]:
+        print(f"{package:<20}{eager[package]:>10.1f}{fast.get(package, 0.0):>10.1f}")
+    print(f"{'total':<20}{sum(eager.values()):>10.1f}{sum(fast.values()):>10.1f}")
+
+if __name__ == "__main__":
+    main()
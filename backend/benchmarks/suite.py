@@ -0,0 +1,209 @@
+"""End-to-end benchmark suite on synthetic match histories at several scales.
+
+For each scale (seasons per league), synthetic per-team match data is generated in a scratch
+folder and every pipeline stage is timed there: aggregation, feature building, loading the
+training data, training and saving the model. A local prediction server is then started on the
+result to measure /predict and /teams latency and throughput. Everything runs offline on the CPU.
+
+Results are saved as JSON. Pass --baseline with an earlier results file to compare against it;
+the command exits with status 1 if any timing regressed by more than --tolerance.
+Run from the backend folder:
+    python -m benchmarks.suite [--scales 1 10 50] [--leagues 3] [--baseline results/suite-....json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+import http.client
+import contextlib
+from urllib.parse import urlencode
+import numpy as np
+from benchmarks import synthetic_data
+from benchmarks.serve_scaling import free_port, wait_until_ready, measure_throughput
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+# Sequential requests per endpoint for the latency percentiles
+LATENCY_REQUESTS = 500
+
+@contextlib.contextmanager
+def timed(timings, name):
+    start = time.perf_counter()
+    yield
+    timings[name] = round(time.perf_counter() - start, 4)
+
+def run_stages(n_leagues, n_seasons, n_teams):
+    """Generate data in the working directory and time each pipeline stage. Returns (stage timings, data sizes)."""
+    import webscraper
+    import data_preprocessor
+    import model_trainer
+    from inference import MODEL_FILE
+    from storage import team_match_data_dir, aggregated_file
+
+    timings = {}
+    with timed(timings, "generate"):
+        partitions, n_rows = synthetic_data.generate(".", n_leagues, n_seasons, n_teams)
+    with timed(timings, "aggregate"):
+        for competition, season in partitions:
+            webscraper.aggregate_data(team_match_data_dir(competition, season), aggregated_file(competition, season))
+    competitions = sorted({competition for competition, _ in partitions})
+    with timed(timings, "features"):
+        data_preprocessor.preprocess(competitions)
+    with timed(timings, "load_training_data"):
+        training_data = model_trainer.load_partitions(competitions)
+        feature_matrix, target = model_trainer.get_features_and_target(training_data)
+    with timed(timings, "train"):
+        model = model_trainer.train_model(feature_matrix, target, model_trainer.XGB_PARAMS)
+    with timed(timings, "save_model"):
+        model_trainer.save_model(model, MODEL_FILE)
+
+    sizes = {"partitions": len(partitions), "match_rows": n_rows, "training_rows": len(training_data), "teams": n_leagues * n_teams}
+    return timings, sizes
+
+def latency_ms(port, paths):
+    """Per-request latency percentiles over one keep-alive connection, cycling through `paths`."""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    samples = []
+    for i in range(LATENCY_REQUESTS):
+        start = time.perf_counter()
+        connection.request("GET", paths[i % len(paths)])
+        response = connection.getresponse()
+        response.read()
+        samples.append((time.perf_counter() - start) * 1000)
+        if response.status != 200:
+            raise RuntimeError(f"GET {paths[i % len(paths)]} returned {response.status}")
+    connection.close()
+    return {f"p{q}_ms": round(float(np.percentile(samples, q)), 3) for q in (50, 95, 99)}
+
+def run_server(workspace, team_names, clients, seconds):
+    """Serve the workspace's model and team data and measure /predict and /teams. Returns the results per endpoint."""
+    port = free_port()
+    command = [sys.executable, "-c", f"import predictor; predictor.app.run(port={port}, use_reloader=False, threaded=True)"]
+    env = {**os.environ, "PYTHONPATH": BACKEND_DIR, "WATCH_ARTIFACTS": "0"}
+    start = time.perf_counter()
+    server = subprocess.Popen(command, cwd=workspace, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_until_ready(f"http://127.0.0.1:{port}", server):
+            raise RuntimeError("Prediction server did not become ready")
+        results = {"startup_s": round(time.perf_counter() - start, 3)}
+
+        # Pairings spread over the whole table, so the response cache sees misses as well as hits
+        rng = np.random.default_rng(0)
+        pairs = [rng.choice(team_names, size=2, replace=False) for _ in range(LATENCY_REQUESTS)]
+        predict_paths = [f"/predict?{urlencode({'home_team': home, 'away_team': away})}" for home, away in pairs]
+        endpoints = {"predict": predict_paths, "teams": ["/teams"]}
+        for name, paths in endpoints.items():
+            results[name] = latency_ms(port, paths)
+            results[name]["requests_per_s"] = round(measure_throughput(port, "GET", paths[0], None, clients, seconds), 1)
+        return results
+    finally:
+        server.terminate()
+        server.wait()
+
+def run_scale(n_leagues, n_seasons, n_teams, clients, seconds):
+    """Benchmark one scale in a scratch folder, which every stage uses as its working directory."""
+    workspace = tempfile.mkdtemp(prefix="epl-benchmark-")
+    previous_dir = os.getcwd()
+    os.chdir(workspace)
+    try:
+        timings, sizes = run_stages(n_leagues, n_seasons, n_teams)
+        team_names = [name for league in range(n_leagues) for name in synthetic_data.team_names(league, n_teams)]
+        server = run_server(workspace, team_names, clients, seconds)
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(workspace, ignore_errors=True)
+    return {"leagues": n_leagues, "seasons": n_seasons, "teams_per_league": n_teams, **sizes, "stages_s": timings, "server": server}
+
+def environment():
+    """Versions and hardware the results were measured on."""
+    import pandas, xgboost
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pandas.__version__,
+        "xgboost": xgboost.__version__,
+    }
+
+def timing_metrics(scale):
+    """Metrics where lower is better, by name, for comparing runs."""
+    metrics = {f"stage {name}": seconds for name, seconds in scale["stages_s"].items()}
+    for endpoint in ("predict", "teams"):
+        metrics.update({f"{endpoint} {key}": value for key, value in scale["server"][endpoint].items() if key.endswith("_ms")})
+        # Throughput is inverted so that, like the others, a bigger number is worse
+        metrics[f"{endpoint} s_per_1k_requests"] = 1000 / scale["server"][endpoint]["requests_per_s"]
+    return metrics
+
+def compare(results, baseline, tolerance):
+    """Print each metric against the baseline run at the same scale. Returns the regressions beyond `tolerance`."""
+    baseline_scales = {(scale["leagues"], scale["seasons"], scale["teams_per_league"]): scale for scale in baseline["scales"]}
+    regressions = []
+    for scale in results["scales"]:
+        key = (scale["leagues"], scale["seasons"], scale["teams_per_league"])
+        if key not in baseline_scales:
+            continue
+        print(f"\n{scale['leagues']} leagues x {scale['seasons']} seasons vs baseline {baseline['environment']['commit']}:")
+        old_metrics = timing_metrics(baseline_scales[key])
+        for name, value in timing_metrics(scale).items():
+            old = old_metrics.get(name)
+            if not old:
+                continue
+            change = value / old - 1
+            flag = "  REGRESSION" if change > tolerance else ""
+            print(f"  {name:<32}{old:>12.4g}{value:>12.4g}{change:>+9.0%}{flag}")
+            if flag:
+                regressions.append((key, name, change))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 50], help="Seasons per league to benchmark")
+    parser.add_argument("--leagues", type=int, default=3)
+    parser.add_argument("--teams", type=int, default=20, help="Teams per league (even)")
+    parser.add_argument("--clients", type=int, default=4, help="Concurrent client processes for throughput")
+    parser.add_argument("--seconds", type=float, default=3, help="Duration of each throughput measurement")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/suite-<time>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Slowdown beyond which a metric counts as a regression")
+    args = parser.parse_args()
+
+    # The stages log every file they touch; only the results matter here
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = {"started": time.strftime("%Y-%m-%dT%H:%M:%S"), "environment": environment(), "scales": []}
+    print(f"{'seasons':>8}{'rows':>9}{'aggregate':>11}{'features':>10}{'train':>8}{'/predict p50':>14}{'/predict rps':>14}{'/teams p50':>12}")
+    for n_seasons in args.scales:
+        scale = run_scale(args.leagues, n_seasons, args.teams, args.clients, args.seconds)
+        results["scales"].append(scale)
+        stages, server = scale["stages_s"], scale["server"]
+        print(f"{n_seasons:>8}{scale['match_rows']:>9}{stages['aggregate']:>10.2f}s{stages['features']:>9.2f}s{stages['train']:>7.2f}s"
+              f"{server['predict']['p50_ms']:>12.2f}ms{server['predict']['requests_per_s']:>14.0f}{server['teams']['p50_ms']:>10.2f}ms")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"suite-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metrics regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Synthetic match histories in the scraper's per-team match data schema, for benchmarking at scale.
+
+Each league has fixed-size squads whose attack and defence strengths drift from season to
+season. Every season is a double round robin, one matchday a week from August. Goals, xG,
+possession and shots are drawn from those strengths, so the data has the structure the model
+learns from. Files go to <root>/Data/<league>/<season>/Team Match Data/, ready for
+webscraper.aggregate_data. Run from the backend folder:
+    python -m benchmarks.synthetic_data --root /tmp/synthetic [--leagues 3] [--seasons 10] [--teams 20]
+"""
+import os
+import argparse
+import datetime
+import numpy as np
+import pandas as pd
+from storage import table_path, write_table, team_match_data_dir
+
+# Mean goals per side, and the home side's advantage on the log scale
+BASE_GOALS = 1.35
+HOME_ADVANTAGE = 0.12
+
+# Spread of team strengths, and how far they drift between seasons
+STRENGTH_SD = 0.3
+STRENGTH_DRIFT_SD = 0.1
+
+LAST_SEASON_START = 2024
+
+def league_name(league):
+    return f"Synthetic League {league + 1}"
+
+def team_names(league, n_teams):
+    return [f"Synthetic {league + 1} Team {team + 1:02d}" for team in range(n_teams)]
+
+def season_label(start_year):
+    return f"{start_year}-{start_year + 1}"
+
+def round_robin(n_teams):
+    """Home/away team indices for each matchday of a double round robin (circle method). n_teams must be even."""
+    teams = list(range(n_teams))
+    first_half = []
+    for matchday in range(n_teams - 1):
+        pairs = [(teams[i], teams[n_teams - 1 - i]) for i in range(n_teams // 2)]
+        if matchday % 2:
+            pairs[0] = pairs[0][::-1]  # The pivot team alternates home and away
+        first_half.append(pairs)
+        teams = [teams[0], teams[-1]] + teams[1:-1]
+    second_half = [[(away, home) for home, away in matchday] for matchday in first_half]
+    return first_half + second_half
+
+def simulate_season(rng, attack, defence, start_year):
+    """One season's matches as (home, away, date, home stats, away stats) arrays."""
+    n_teams = len(attack)
+    matchdays = round_robin(n_teams)
+    home = np.array([home for matchday in matchdays for home, _ in matchday])
+    away = np.array([away for matchday in matchdays for _, away in matchday])
+    first_matchday = datetime.date(start_year, 8, 10)
+    dates = np.repeat([first_matchday + datetime.timedelta(weeks=week) for week in range(len(matchdays))], n_teams // 2)
+
+    expected_home = BASE_GOALS * np.exp(HOME_ADVANTAGE + attack[home] - defence[away])
+    expected_away = BASE_GOALS * np.exp(attack[away] - defence[home])
+
+    def side_stats(expected_for, expected_against):
+        n = len(expected_for)
+        shots = rng.poisson(expected_for * 9)
+        return {
+            "GF": rng.poisson(expected_for),
+            "xG": np.round(expected_for * rng.gamma(8, 1 / 8, n), 1),
+            "Poss": np.clip(np.round(50 + 25 * np.log(expected_for / expected_against) + rng.normal(0, 5, n)), 20, 80),
+            "Sh": shots,
+            "SoT": rng.binomial(shots, 0.35),
+            "FK": rng.poisson(0.3, n).astype(float),
+            "PKatt": rng.poisson(0.12, n),
+        }
+
+    return home, away, dates, side_stats(expected_home, expected_away), side_stats(expected_away, expected_home)
+
+def team_match_rows(names, home, away, dates, home_stats, away_stats):
+    """Per-team match data rows, both perspectives of every match, in the scraper's column order."""
+    frames = []
+    for venue, team, opponent, own, other in (("Home", home, away, home_stats, away_stats), ("Away", away, home, away_stats, home_stats)):
+        goal_diff = own["GF"] - other["GF"]
+        frames.append(pd.DataFrame({
+            "Date": [date.isoformat() for date in dates],
+            "Venue": venue,
+            "Result": np.where(goal_diff > 0, "W", np.where(goal_diff < 0, "L", "D")),
+            "GF": own["GF"],
+            "GA": other["GF"],
+            "Opponent": np.array(names)[opponent],
+            "xG": own["xG"],
+            "xGA": other["xG"],
+            "Poss": own["Poss"],
+            "Sh": own["Sh"],
+            "SoT": own["SoT"],
+            "FK": own["FK"],
+            "PKatt": own["PKatt"],
+            "Team": np.array(names)[team],
+            "Logo": [f"https://example.invalid/logos/{name.replace(' ', '_')}.png" for name in np.array(names)[team]],
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+def generate(root, n_leagues, n_seasons, n_teams=20, seed=0):
+    """Write synthetic per-team match data under `root`/Data. Returns the (league, season) partitions and total match rows."""
+    rng = np.random.default_rng(seed)
+    partitions, n_rows = [], 0
+    for league in range(n_leagues):
+        competition, names = league_name(league), team_names(league, n_teams)
+        attack = rng.normal(0, STRENGTH_SD, n_teams)
+        defence = rng.normal(0, STRENGTH_SD, n_teams)
+        for start_year in range(LAST_SEASON_START - n_seasons + 1, LAST_SEASON_START + 1):
+            season = season_label(start_year)
+            rows = team_match_rows(names, *simulate_season(rng, attack, defence, start_year))
+
+            folder = os.path.join(root, team_match_data_dir(competition, season))
+            os.makedirs(folder, exist_ok=True)
+            for team, team_rows in rows.groupby("Team", sort=False):
+                file_path = table_path(os.path.join(folder, f"{team.replace(' ', '_')}_match_data"))
+                write_table(team_rows.sort_values("Date"), file_path)
+
+            partitions.append((competition, season))
+            n_rows += len(rows)
+            attack = attack + rng.normal(0, STRENGTH_DRIFT_SD, n_teams)
+            defence = defence + rng.normal(0, STRENGTH_DRIFT_SD, n_teams)
+    return partitions, n_rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", required=True, help="Folder to create the Data tree in")
+    parser.add_argument("--leagues", type=int, default=3)
+    parser.add_argument("--seasons", type=int, default=10)
+    parser.add_argument("--teams", type=int, default=20, help="Teams per league (even)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    partitions, n_rows = generate(args.root, args.leagues, args.seasons, args.teams, args.seed)
+    print(f"Wrote {n_rows} match rows in {len(partitions)} partitions under {os.path.join(args.root, 'Data')}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Wall time of model_trainer's walk-forward tuning as parallel workers are added.
+
+Each run scores the same candidates, so the speedup over one worker shows how close
+tuning gets to linear scaling with cores. Run from the backend folder:
+    python -m benchmarks.tuning_scaling [--candidates 16] [--max-workers 8]
+"""
+import os
+import time
+import argparse
+import pandas as pd
+import model_trainer
+from features import FEATURE_COLUMNS
+from storage import DEFAULT_COMPETITION
+
+def worker_counts(max_workers):
+    """1, 2, 4, ... up to max_workers, always including max_workers."""
+    counts = [1]
+    while counts[-1] * 2 < max_workers:
+        counts.append(counts[-1] * 2)
+    if max_workers > 1:
+        counts.append(max_workers)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--competitions", nargs="+", default=[DEFAULT_COMPETITION])
+    parser.add_argument("--candidates", type=int, default=16)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    data = model_trainer.load_partitions(args.competitions, columns=FEATURE_COLUMNS + ["Match_Result", "Date"])
+    if data is None:
+        return
+    data["Date"] = pd.to_datetime(data["Date"])
+    candidates = model_trainer.search_candidates("random", args.candidates, seed=0)
+
+    print(f"{len(data)} rows, {len(candidates)} candidates x {model_trainer.CV_FOLDS} folds, {os.cpu_count()} cores")
+    print(f"{'workers':>8}{'wall (s)':>10}{'speedup':>10}{'efficiency':>12}")
+    baseline = None
+    for n_workers in worker_counts(args.max_workers):
+        start = time.perf_counter()
+        model_trainer.tune_model(data, candidates, n_workers)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{n_workers:>8}{elapsed:>10.2f}{baseline / elapsed:>10.2f}{baseline / elapsed / n_workers:>12.0%}")
+
+if __name__ == "__main__":
+    main()
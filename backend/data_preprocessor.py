@@ -1,47 +1,90 @@
 import os
 import logging
+import argparse
+import numpy as np
 import pandas as pd
+from storage import DATA_DIR, DEFAULT_COMPETITION, table_path, read_table, write_table, aggregated_file, training_data_file, list_partitions
+from team_registry import TeamRegistry
 
 # Logging Configuration
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# File constants
-DATA_DIR = "Data"
-TEAM_DATA_FILE = os.path.join(DATA_DIR, "team_data.csv")
-TRAINING_DATA_FILE = os.path.join(DATA_DIR, "training_data.csv")
-AGGREGATED_FILE = os.path.join(DATA_DIR, "agg_match_data.csv")
+# File constants; match and training data live in Data/<competition>/<season>/ partitions
+TEAM_DATA_FILE = table_path(os.path.join(DATA_DIR, "team_data"))
 
-def load_data(file_path):
-    """Load CSV data into a pandas DataFrame."""
+# Aggregated match data columns used to build features
+MATCH_DATA_COLS = [
+    "Date", "Venue", "Result", "GF", "GA", "Opponent", "xG", "xGA", "Poss", "Sh", "SoT", "FK", "PKatt", "Team", "Logo"
+]
+
+def load_data(file_path, columns=None):
+    """Load match data into a pandas DataFrame indexed by ID, reading only `columns` if given."""
     try:
-        data = pd.read_csv(file_path, index_col=0)
+        data = read_table(file_path, columns=columns, index_col="ID")
         logging.info(f"Successfully loaded data from {file_path}")
         return data
     except Exception as e:
         logging.error(f"Error loading data from {file_path}: {e}")
         return None
 
-def clean_data(data):
-    """Clean match data by converting date and categorical variables."""
+def clean_data(data, registry):
+    """Clean match data by converting date and categorical variables. Team codes come from `registry`."""
     data["Date"] = pd.to_datetime(data["Date"], errors="coerce")
     data = data.sort_values("Date")
-    data["Result"] = data["Result"].map({"W": 2, "D": 1, "L": 0})
-    data["Venue"] = data["Venue"].map({"Home": 0, "Away": 1})
-    data["Team_code"] = data["Team"].astype("category").cat.codes
+    data["Result"] = data["Result"].astype(object).map({"W": 2, "D": 1, "L": 0})
+    data["Venue"] = data["Venue"].astype(object).map({"Home": 0, "Away": 1})
+    data["Team_code"] = registry.codes_for(data["Team"])
     return data
 
-def rolling_averages(group, cols):
-    """Compute rolling averages for performance stats."""
-    group = group.sort_values("Date")
-    return group.assign(**{f"{col}_rolling": group[col].rolling(window=5, min_periods=3, closed='left').mean() for col in cols})
-
-def cumulative_stats(group):
-    """Compute cumulative goal differential and win/draw/loss percentages."""
-    group = group.sort_values("Date")
-    group["GD"] = (group["GF"] - group["GA"]).expanding().sum().shift(1)
-    for result, label in zip([2, 1, 0], ["Win%", "Draw%", "Loss%"]):
-        group[label] = (group["Result"] == result).expanding().mean().shift(1)
-    return group
+def build_features(match_data, cols):
+    """Compute rolling and cumulative features for every match, plus each team's latest snapshot, in one pass.
+
+    Rows are sorted by team and date once. Each team then gets one snapshot row after
+    its last match, so the same shifted (pre-match) rolling and cumulative transforms
+    that give the features for a match also give the team's stats after all of its
+    matches. Returns (per-match rows with features in the input's row order, per-team snapshot).
+    """
+    data = match_data.sort_values(["Team", "Date"], kind="stable")
+    index_name = data.index.name
+    data = data.reset_index()
+
+    # Parquet and Feather load Team as categorical; group on plain names so unobserved categories don't get groups
+    data["Team"] = data["Team"].astype(object)
+
+    # Interleave one empty snapshot row after each team's last match, without re-sorting
+    group_ids = data.groupby("Team", sort=True).ngroup().to_numpy()
+    group_sizes = np.bincount(group_ids)
+    snapshots = pd.DataFrame({"Team": data["Team"].iloc[np.cumsum(group_sizes) - 1].to_numpy()})
+    order = np.empty(len(data) + len(snapshots), dtype=int)
+    order[np.arange(len(data)) + group_ids] = np.arange(len(data))
+    order[np.cumsum(group_sizes) + np.arange(len(group_sizes))] = len(data) + np.arange(len(snapshots))
+    combined = pd.concat([data, snapshots], ignore_index=True).iloc[order].reset_index(drop=True)
+    is_snapshot = combined.index.isin(np.cumsum(group_sizes) + np.arange(len(group_sizes)))
+
+    grouped = combined.groupby("Team", sort=False)
+    teams = combined["Team"]
+
+    # Averages over the previous five matches
+    rolling = grouped[cols].rolling(window=5, min_periods=3, closed='left').mean()
+    combined[[f"{col}_rolling" for col in cols]] = rolling.to_numpy()
+
+    # Goal differential and W/D/L counts and rates over all previous matches
+    goal_diff = (combined["GF"] - combined["GA"]).groupby(teams).expanding().sum()
+    combined["GD"] = pd.Series(goal_diff.to_numpy(), index=combined.index).groupby(teams).shift(1)
+    matches_before = grouped.cumcount()
+    for result, count_label, rate_label in zip([2, 1, 0], ["Wins", "Draws", "Losses"], ["Win%", "Draw%", "Loss%"]):
+        combined[count_label] = (combined["Result"] == result).groupby(teams).cumsum().groupby(teams).shift(1)
+        combined[rate_label] = combined[count_label] / matches_before
+
+    # Training rows need complete stats, as before; snapshot rows upcast integer columns, so restore them
+    match_features = combined[~is_snapshot].astype(data.dtypes.to_dict())
+    match_features = match_features.set_index(index_name).drop(columns=["Wins", "Draws", "Losses"])
+    match_features = match_features.loc[match_data.index].dropna()
+
+    team_snapshot = combined.loc[is_snapshot, ["Team"] + [f"{col}_rolling" for col in cols] + [
+        "GD", "Wins", "Draws", "Losses", "Win%", "Draw%", "Loss%"
+    ]].set_index("Team")
+    return match_features, team_snapshot
 
 def merge_match_data(home_data, away_data, rolling_cols):
     """Merge Home and Away team stats into a single row per match."""
@@ -64,70 +107,85 @@ def merge_match_data(home_data, away_data, rolling_cols):
     }).sort_values("Date")
 
 def save_data(data, file_path):
-    """Save DataFrame to a CSV file."""
+    """Save DataFrame to a table file."""
     try:
-        data.to_csv(file_path, index=False)
+        write_table(data, file_path)
         logging.info(f"Data successfully saved to {file_path}")
     except Exception as e:
         logging.error(f"Error saving data to {file_path}: {e}")
 
-def final_rolling_average(group, cols):
-    """Compute rolling averages based on the last 5 matches."""
-    group = group.sort_values("Date")
-    rolling_cols = [f"{col}_rolling" for col in cols]
-    group[rolling_cols] = group[cols].rolling(window=5, min_periods=3, closed='right').mean()
-    return group[rolling_cols].iloc[-1]  # Get the last available rolling average
-
-def final_cumulative_stats(group):
-    """Compute cumulative stats based on all available matches."""
-    group = group.sort_values("Date")
-    total_gd = (group["GF"] - group["GA"]).sum()
-    total_W = (group["Result"] == 2).sum()
-    total_D = (group["Result"] == 1).sum()
-    total_L = (group["Result"] == 0).sum()
-    
-    win_percentage = (group["Result"] == 2).mean()
-    draw_percentage = (group["Result"] == 1).mean()
-    loss_percentage = (group["Result"] == 0).mean()
-    
-    return pd.Series({
-        "GD": total_gd,
-        "Wins": total_W,
-        "Draws": total_D,
-        "Losses": total_L,
-        "Win%": win_percentage,
-        "Draw%": draw_percentage,
-        "Loss%": loss_percentage
-    })
+def merge_team_data(team_data):
+    """Save team_data, replacing the rows of the competitions in `team_data` and keeping every other competition's teams."""
+    if os.path.exists(TEAM_DATA_FILE):
+        existing = read_table(TEAM_DATA_FILE)
+        if "Competition" not in existing.columns:
+            existing["Competition"] = DEFAULT_COMPETITION  # Saved before team_data covered several competitions
+        other_competitions = existing[~existing["Competition"].isin(team_data["Competition"].unique())]
+        team_data = pd.concat([other_competitions, team_data], ignore_index=True)
+    save_data(team_data.sort_values("Team_Code"), TEAM_DATA_FILE)
+
+def preprocess_partition(competition, season, registry):
+    """Build and save one partition's training data. Returns its teams' latest stats for team_data, or None."""
+    match_data = load_data(aggregated_file(competition, season), MATCH_DATA_COLS)
+    if match_data is None:
+        return None
+    match_data = clean_data(match_data, registry)
+
+    cols_to_roll = ["GF", "GA", "xG", "xGA", "Poss", "Sh", "SoT", "FK", "PKatt"]
+    match_data_rolling, team_stats = build_features(match_data, cols_to_roll)
+
+    # Split into Home and Away team data and merge
+    home_match_data = match_data_rolling[match_data_rolling["Venue"] == 0].copy()
+    away_match_data = match_data_rolling[match_data_rolling["Venue"] == 1].copy()
+    merged_match_data = merge_match_data(home_match_data, away_match_data, cols_to_roll)
+
+    # Save cleaned match data
+    save_data(merged_match_data, training_data_file(competition, season))
+
+    # Attach each team's code and logo to its latest stats
+    team_codes = match_data[["Team_code", "Team", "Logo"]].drop_duplicates()
+    team_data = team_codes.merge(team_stats, on="Team").rename(columns={"Team": "Team_Name", "Team_code": "Team_Code"})
+    team_data["Competition"] = competition
+    return team_data
+
+def preprocess(competitions, seasons=None):
+    """Build training data for each partition and team data from each competition's latest season. Returns False if there was no data.
+
+    Team data is only replaced for competitions whose latest season on disk was processed;
+    other competitions' teams are kept as they are.
+    """
+    partitions = list_partitions(competitions, seasons)
+    if not partitions:
+        logging.error(f"No data partitions found for {', '.join(competitions)}.")
+        return False
+
+    # Partitions are listed in season order, so the last one seen per competition is its latest
+    latest_seasons = dict(list_partitions(competitions))
+
+    registry = TeamRegistry.load()
+    latest_team_data = []
+    for competition, season in partitions:
+        logging.info(f"Preprocessing {competition} {season}...")
+        team_data = preprocess_partition(competition, season, registry)
+        if team_data is not None and season == latest_seasons[competition]:
+            latest_team_data.append(team_data)
+    registry.save()
+
+    for competition in sorted({competition for competition, _ in partitions}):
+        if (competition, latest_seasons[competition]) not in partitions:
+            logging.info(f"Keeping {competition}'s team data, since its latest season {latest_seasons[competition]} wasn't processed")
+
+    if latest_team_data:
+        merge_team_data(pd.concat(latest_team_data, ignore_index=True))
+    return True
 
 def main():
-    # Load and clean data
-    match_data = load_data(AGGREGATED_FILE)
-    if match_data is not None:
-        match_data = clean_data(match_data)
-
-        cols_to_roll = ["GF", "GA", "xG", "xGA", "Poss", "Sh", "SoT", "FK", "PKatt"]
-        match_data_rolling = match_data.groupby("Team", group_keys=False).apply(rolling_averages, cols_to_roll)
-        match_data_rolling = match_data_rolling.groupby("Team", group_keys=False).apply(cumulative_stats).dropna()
-
-        # Split into Home and Away team data and merge
-        home_match_data = match_data_rolling[match_data_rolling["Venue"] == 0].copy()
-        away_match_data = match_data_rolling[match_data_rolling["Venue"] == 1].copy()
-        merged_match_data = merge_match_data(home_match_data, away_match_data, cols_to_roll)
-
-        # Save cleaned match data
-        save_data(merged_match_data, TRAINING_DATA_FILE)
-
-        # Compute rolling averages and cumulative stats for each team
-        team_stats = match_data.groupby("Team").apply(lambda group: pd.concat([
-            final_rolling_average(group, cols_to_roll),
-            final_cumulative_stats(group)
-        ], axis=0), include_groups=False)
-        team_codes = match_data[["Team_code", "Team", "Logo"]].drop_duplicates()
-        team_data = team_codes.merge(team_stats, on="Team").sort_values("Team_code").rename(columns={"Team": "Team_Name", "Team_code": "Team_Code"})
-        
-        # Save team data
-        save_data(team_data, TEAM_DATA_FILE)
+    parser = argparse.ArgumentParser(description="Build training data per partition and team data from each competition's latest season.")
+    parser.add_argument("--competitions", nargs="+", default=[DEFAULT_COMPETITION])
+    parser.add_argument("--seasons", nargs="+", help="Seasons to process, e.g. 2023-2024 (default: all on disk)")
+    args = parser.parse_args()
+
+    preprocess(args.competitions, args.seasons)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,361 @@
+import os
+import json
+import logging
+import argparse
+from collections import deque
+import numpy as np
+import pandas as pd
+from features import ROLLING_STATS, ROLLING_COLS, CUMULATIVE_COLS
+from storage import (
+    DEFAULT_COMPETITION, read_table, write_table, append_table, current_season, partition_dir,
+    aggregated_file, training_data_file, list_partitions
+)
+from team_registry import TeamRegistry
+import data_preprocessor
+from data_preprocessor import MATCH_DATA_COLS
+
+# Logging Configuration
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# File kept in each Data/<competition>/<season>/ partition
+FEATURE_STORE_FILE_NAME = "feature_store.json"
+
+# Rolling window settings, matching data_preprocessor.build_features
+ROLLING_WINDOW = 5
+ROLLING_MIN_PERIODS = 3
+
+# Stats each side of a reported result gives for itself; GF/GA and xGA come from the two sides' goals and xG
+SIDE_STATS = ["xG", "Poss", "Sh", "SoT", "FK", "PKatt"]
+
+RESULT_CODES = {"W": 2, "D": 1, "L": 0}
+VENUE_CODES = {"Home": 0, "Away": 1}
+
+# Largest difference allowed between the store and a full rebuild when checking consistency
+CHECK_TOLERANCE = 1e-9
+
+class TeamState:
+    """A team's form after its latest match: the last five matches' stats plus running totals."""
+
+    def __init__(self, team, code, logo):
+        self.team = team
+        self.code = code
+        self.logo = logo
+        self.recent = deque(maxlen=ROLLING_WINDOW)  # Each entry holds one match's ROLLING_STATS
+        self.goal_diff = 0.0
+        self.goal_diff_matches = 0  # Matches with a known goal differential
+        self.results = {2: 0, 1: 0, 0: 0}
+        self.matches = 0
+        self.last_date = None
+
+    def rolling(self):
+        """Average of each stat over the last five matches, or NaN with fewer than three values."""
+        values = np.array(self.recent, dtype=float).reshape(-1, len(ROLLING_STATS))
+        counts = np.sum(~np.isnan(values), axis=0)
+        with np.errstate(invalid="ignore"):
+            means = np.nansum(values, axis=0) / counts
+        return np.where(counts >= ROLLING_MIN_PERIODS, means, np.nan)
+
+    def cumulative(self):
+        """Goal differential and win/draw/loss rates over all matches so far (NaN before the first)."""
+        if self.matches == 0:
+            return np.full(len(CUMULATIVE_COLS), np.nan)
+        goal_diff = self.goal_diff if self.goal_diff_matches else np.nan
+        return np.array([goal_diff] + [self.results[result] / self.matches for result in (2, 1, 0)])
+
+    def features(self):
+        """This team's model inputs (TEAM_FEATURE_COLS order) going into its next match."""
+        return np.concatenate([self.rolling(), self.cumulative()])
+
+    def update(self, match):
+        """Fold one finished match (a row in the aggregated match data schema) into the state in O(1)."""
+        self.recent.append([float(match[stat]) for stat in ROLLING_STATS])
+        goal_diff = float(match["GF"]) - float(match["GA"])
+        if not np.isnan(goal_diff):
+            self.goal_diff += goal_diff
+            self.goal_diff_matches += 1
+        if match["Result"] in RESULT_CODES:
+            self.results[RESULT_CODES[match["Result"]]] += 1
+        self.matches += 1
+        self.last_date = str(pd.Timestamp(match["Date"]).date())
+        if pd.notna(match["Logo"]):
+            self.logo = match["Logo"]
+
+    def team_data_row(self):
+        """This team's row in team_data."""
+        row = {"Team_Code": self.code, "Team_Name": self.team, "Logo": self.logo}
+        row.update(zip(ROLLING_COLS, self.rolling()))
+        gd, win_rate, draw_rate, loss_rate = self.cumulative()
+        row.update({
+            "GD": gd, "Wins": float(self.results[2]), "Draws": float(self.results[1]), "Losses": float(self.results[0]),
+            "Win%": win_rate, "Draw%": draw_rate, "Loss%": loss_rate
+        })
+        return row
+
+    def to_dict(self):
+        return {
+            "team": self.team, "code": self.code, "logo": self.logo,
+            "recent": [[None if np.isnan(value) else value for value in stats] for stats in self.recent],
+            "goal_diff": self.goal_diff, "goal_diff_matches": self.goal_diff_matches,
+            "results": {str(result): count for result, count in self.results.items()},
+            "matches": self.matches, "last_date": self.last_date
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data["team"], data["code"], data["logo"])
+        state.recent.extend([[np.nan if value is None else value for value in stats] for stats in data["recent"]])
+        state.goal_diff = data["goal_diff"]
+        state.goal_diff_matches = data["goal_diff_matches"]
+        state.results = {int(result): count for result, count in data["results"].items()}
+        state.matches = data["matches"]
+        state.last_date = data["last_date"]
+        return state
+
+class FeatureStore:
+    """Per-team state for one competition season that turns each newly finished match
+    into a training row and refreshed team_data rows."""
+
+    def __init__(self, competition, season, teams=None, registry=None):
+        self.competition = competition
+        self.season = season
+        self.teams = teams or {}
+        self.registry = registry if registry is not None else TeamRegistry.load()
+
+    @classmethod
+    def load(cls, competition, season):
+        with open(feature_store_file(competition, season), encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(competition, season, {team: TeamState.from_dict(state) for team, state in data["teams"].items()})
+
+    def save(self):
+        """Save the team states, along with any teams newly added to the registry."""
+        file_path = feature_store_file(self.competition, self.season)
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"teams": {team: state.to_dict() for team, state in self.teams.items()}}, f)
+        os.replace(tmp_path, file_path)
+        self.registry.save()
+
+    def get_team(self, team, logo):
+        """Return a team's state, starting one with the team's registry code for teams seen for the first time."""
+        if team not in self.teams:
+            self.teams[team] = TeamState(team, self.registry.code(team), logo)
+        return self.teams[team]
+
+    def is_new(self, match):
+        """Whether a match row is later than the latest match already folded into its team's state."""
+        state = self.teams.get(match["Team"])
+        return state is None or state.last_date is None or str(pd.Timestamp(match["Date"]).date()) > state.last_date
+
+    def ingest(self, match_rows):
+        """Fold new match rows (aggregated match data schema, both teams' perspectives) into the store.
+
+        Matches are processed in date order. A home and away row for the same fixture yield
+        one training row built from both teams' form going into the match, kept only when
+        every value is present as in the full pipeline. Returns the new training rows and
+        the names of the teams whose state changed.
+        """
+        match_rows = match_rows[[self.is_new(row) for _, row in match_rows.iterrows()]]
+        match_rows = match_rows.assign(Date=pd.to_datetime(match_rows["Date"], errors="coerce")).sort_values("Date", kind="stable")
+
+        training_rows, updated_teams = [], set()
+        for date, day_rows in match_rows.groupby("Date", sort=True):
+            rows_by_team = {row["Team"]: row for _, row in day_rows.iterrows()}
+
+            # Build every fixture's row from pre-match form before any team's state moves on
+            for team, home in rows_by_team.items():
+                away = rows_by_team.get(home["Opponent"])
+                if home["Venue"] != "Home" or away is None or away["Venue"] != "Away":
+                    continue
+                home_state = self.get_team(team, home["Logo"])
+                away_state = self.get_team(away["Team"], away["Logo"])
+                row = self.training_row(date, home, away, home_state, away_state)
+                if row is not None:
+                    training_rows.append(row)
+
+            for team, match in rows_by_team.items():
+                self.get_team(team, match["Logo"]).update(match)
+                updated_teams.add(team)
+
+        return pd.DataFrame(training_rows, columns=training_columns()), updated_teams
+
+    def training_row(self, date, home, away, home_state, away_state):
+        """The training row for a fixture, or None if any value is missing."""
+        home_features, away_features = home_state.features(), away_state.features()
+        match_values = [home[col] for col in MATCH_DATA_COLS] + [away[col] for col in MATCH_DATA_COLS]
+        if (
+            np.isnan(home_features).any() or np.isnan(away_features).any() or pd.isna(match_values).any()
+            or home["Result"] not in RESULT_CODES or away["Result"] not in RESULT_CODES
+        ):
+            return None
+
+        n_rolling = len(ROLLING_COLS)
+        return [date, RESULT_CODES[home["Result"]], home_state.team, home_state.code, away_state.team, away_state.code] + (
+            list(home_features[:n_rolling]) + list(away_features[:n_rolling])
+            + list(home_features[n_rolling:]) + list(away_features[n_rolling:])
+        )
+
+    def team_data(self):
+        """The full team_data table built from the current states."""
+        rows = [state.team_data_row() for state in self.teams.values()]
+        return pd.DataFrame(rows).assign(Competition=self.competition).sort_values("Team_Code")
+
+def feature_store_file(competition, season):
+    """Path of a partition's feature store."""
+    return os.path.join(partition_dir(competition, season), FEATURE_STORE_FILE_NAME)
+
+def latest_season(competition):
+    """The latest season on disk for a competition, or the current season if there is none."""
+    partitions = list_partitions([competition])
+    return partitions[-1][1] if partitions else current_season()
+
+def training_columns():
+    """Training data columns, in the order written by data_preprocessor.merge_match_data."""
+    return ["Date", "Match_Result", "Home_Team", "Home_Team_code", "Away_Team", "Away_Team_code"] + [
+        f"{col}_home" for col in ROLLING_COLS] + [f"{col}_away" for col in ROLLING_COLS] + [
+        f"{col}_home" for col in CUMULATIVE_COLS] + [f"{col}_away" for col in CUMULATIVE_COLS]
+
+def load_match_data(competition, season):
+    """Load a partition's aggregated match data."""
+    return read_table(aggregated_file(competition, season), columns=MATCH_DATA_COLS, index_col="ID")
+
+def write_team_data(store):
+    """Replace the store's competition's rows in team_data with its current team states."""
+    data_preprocessor.merge_team_data(store.team_data())
+
+def result_rows(date, home_team, away_team, home_stats, away_stats):
+    """A finished match as its two aggregated match data rows, from each side's "goals" and SIDE_STATS."""
+    rows = []
+    for team, opponent, venue, stats, opponent_stats in (
+        (home_team, away_team, "Home", home_stats, away_stats),
+        (away_team, home_team, "Away", away_stats, home_stats),
+    ):
+        goals_for, goals_against = stats["goals"], opponent_stats["goals"]
+        result = "W" if goals_for > goals_against else "D" if goals_for == goals_against else "L"
+        row = {"Date": date, "Venue": venue, "Result": result, "GF": goals_for, "GA": goals_against, "Opponent": opponent}
+        row.update({stat: np.nan if stats.get(stat) is None else stats[stat] for stat in SIDE_STATS})
+        row.update({"xGA": np.nan if opponent_stats.get("xG") is None else opponent_stats["xG"], "Team": team, "Logo": None})
+        rows.append(row)
+    return pd.DataFrame(rows, columns=MATCH_DATA_COLS, dtype=object)
+
+def record_results(match_rows, competition=DEFAULT_COMPETITION, season=None):
+    """Fold a reported fixture's rows into a partition's store and append them to its aggregated match data.
+
+    The store is initialized from the aggregated match data first if the partition has none.
+    The fixture is only recorded when every row is newer than its team's latest match, so a
+    fixture is never half-applied. Returns the same as update_store, with no updated teams
+    when nothing was recorded.
+    """
+    season = season or latest_season(competition)
+    if not os.path.exists(feature_store_file(competition, season)):
+        initialize_store(competition, season)
+
+    store = FeatureStore.load(competition, season)
+    if match_rows.empty or not all(store.is_new(row) for _, row in match_rows.iterrows()):
+        return store, pd.DataFrame(columns=training_columns()), set()
+    new_rows = match_rows
+
+    # Reported results carry no logo; keep each known team's, so the rows are complete like scraped ones
+    new_rows = new_rows.assign(Logo=[
+        logo if pd.notna(logo) else getattr(store.teams.get(team), "logo", None)
+        for team, logo in zip(new_rows["Team"], new_rows["Logo"])
+    ])
+    store, training_rows, updated_teams = update_store(new_rows, competition, season)
+    if updated_teams:
+        match_data_file = aggregated_file(competition, season)
+        next_id = load_match_data(competition, season).index.max() + 1 if os.path.exists(match_data_file) else 0
+        new_rows = new_rows.set_index(pd.RangeIndex(next_id, next_id + len(new_rows), name="ID"))
+        append_table(new_rows, match_data_file, index=True)
+    return store, training_rows, updated_teams
+
+def initialize_store(competition=DEFAULT_COMPETITION, season=None):
+    """Build a partition's store from scratch by replaying every match, writing training and team data from it."""
+    season = season or latest_season(competition)
+    match_data = load_match_data(competition, season)
+
+    # Teams new to the registry get codes in alphabetical order, as in data_preprocessor.clean_data
+    store = FeatureStore(competition, season)
+    for team in sorted(match_data["Team"].dropna().unique()):
+        store.teams[team] = TeamState(team, store.registry.code(team), None)
+
+    training_rows, _ = store.ingest(match_data)
+    write_table(training_rows, training_data_file(competition, season))
+    write_team_data(store)
+    store.save()
+    logging.info(f"Feature store initialized with {len(store.teams)} teams and {len(training_rows)} training rows")
+    return store
+
+def update_store(match_rows=None, competition=DEFAULT_COMPETITION, season=None):
+    """Fold matches not yet in a partition's store into it, appending training rows and refreshing team data.
+
+    Without `match_rows`, new matches are read from the partition's aggregated match data file.
+    """
+    season = season or latest_season(competition)
+    store = FeatureStore.load(competition, season)
+    if match_rows is None:
+        match_rows = load_match_data(competition, season)
+
+    training_rows, updated_teams = store.ingest(match_rows)
+    if not updated_teams:
+        logging.info("No new matches to add to the feature store.")
+        return store, training_rows, updated_teams
+
+    if not training_rows.empty:
+        append_table(training_rows, training_data_file(competition, season))
+    write_team_data(store)
+    store.save()
+    logging.info(f"Added {len(training_rows)} training rows; refreshed team data for {', '.join(sorted(updated_teams))}")
+    return store, training_rows, updated_teams
+
+def check_store(competition=DEFAULT_COMPETITION, season=None):
+    """Compare a partition's store and training data with a full rebuild by data_preprocessor. Returns True if they agree."""
+    season = season or latest_season(competition)
+    match_data = data_preprocessor.clean_data(load_match_data(competition, season), TeamRegistry.load())
+    match_features, team_stats = data_preprocessor.build_features(match_data, ROLLING_STATS)
+    home_match_data = match_features[match_features["Venue"] == 0]
+    away_match_data = match_features[match_features["Venue"] == 1]
+    rebuilt_training = data_preprocessor.merge_match_data(home_match_data, away_match_data, ROLLING_STATS)
+
+    store = FeatureStore.load(competition, season)
+    stored_training = read_table(training_data_file(competition, season))
+    stored_team_data = store.team_data().set_index("Team_Name")
+
+    consistent = True
+    keys = ["Date", "Home_Team", "Away_Team"]
+    rebuilt_training = rebuilt_training.assign(Date=pd.to_datetime(rebuilt_training["Date"])).sort_values(keys).reset_index(drop=True)
+    stored_training = stored_training.assign(Date=pd.to_datetime(stored_training["Date"])).sort_values(keys).reset_index(drop=True)
+    if len(rebuilt_training) != len(stored_training) or not (rebuilt_training[keys] == stored_training[keys]).all().all():
+        logging.error(f"Training rows differ: {len(stored_training)} stored vs {len(rebuilt_training)} rebuilt")
+        consistent = False
+    else:
+        numeric_cols = training_columns()[1:2] + training_columns()[6:]
+        difference = np.abs(rebuilt_training[numeric_cols].to_numpy(float) - stored_training[numeric_cols].to_numpy(float)).max()
+        if difference > CHECK_TOLERANCE:
+            logging.error(f"Training features differ from a full rebuild by up to {difference}")
+            consistent = False
+
+    team_cols = list(team_stats.columns)
+    difference = np.nanmax(np.abs(team_stats[team_cols].to_numpy(float) - stored_team_data.loc[team_stats.index, team_cols].to_numpy(float)))
+    if difference > CHECK_TOLERANCE or not (team_stats[team_cols].isna() == stored_team_data.loc[team_stats.index, team_cols].isna()).all().all():
+        logging.error(f"Team data differs from a full rebuild by up to {difference}")
+        consistent = False
+
+    if consistent:
+        logging.info("Feature store matches a full rebuild.")
+    return consistent
+
+def main():
+    commands = {"init": initialize_store, "update": update_store, "check": check_store}
+    parser = argparse.ArgumentParser(description="Build, update or check a partition's incremental feature store.")
+    parser.add_argument("command", choices=commands)
+    parser.add_argument("--competition", default=DEFAULT_COMPETITION)
+    parser.add_argument("--season", help="Season partition, e.g. 2024-2025 (default: the latest on disk)")
+    args = parser.parse_args()
+
+    if args.command == "update":
+        update_store(competition=args.competition, season=args.season)
+    else:
+        commands[args.command](args.competition, args.season)
+
+if __name__ == "__main__":
+    main()
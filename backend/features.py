@@ -0,0 +1,15 @@
+# Match stats averaged over each team's previous five matches
+ROLLING_STATS = ["GF", "GA", "xG", "xGA", "Poss", "Sh", "SoT", "FK", "PKatt"]
+ROLLING_COLS = [f"{col}_rolling" for col in ROLLING_STATS]
+
+# Season-to-date stats
+CUMULATIVE_COLS = ["GD", "Win%", "Draw%", "Loss%"]
+
+# Per-team model inputs, in the order they appear for each side of a fixture
+TEAM_FEATURE_COLS = ROLLING_COLS + CUMULATIVE_COLS
+
+# Model input columns, in training order
+BASE_FEATURES = ["Home_Team_code", "Away_Team_code"]
+HOME_FEATURES = [f"{col}_home" for col in TEAM_FEATURE_COLS]
+AWAY_FEATURES = [f"{col}_away" for col in TEAM_FEATURE_COLS]
+FEATURE_COLUMNS = BASE_FEATURES + HOME_FEATURES + AWAY_FEATURES
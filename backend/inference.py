@@ -0,0 +1,156 @@
+import os
+import json
+import numpy as np
+from features import FEATURE_COLUMNS
+
+# File constants: the pickled sklearn wrapper, the booster in xgboost's native formats,
+# and a manifest recording the feature order the booster expects
+MODEL_FILE = "xgb_model.pkl"
+NATIVE_MODEL_FILE = "xgb_model.ubj"
+JSON_MODEL_FILE = "xgb_model.json"
+MANIFEST_FILE = "xgb_model.manifest.json"
+
+# Ways to run the model: 'sklearn' unpickles the XGBClassifier, 'booster' runs the native
+# booster's in-place predict, 'numpy' evaluates the exported trees without xgboost
+BACKENDS = ("sklearn", "booster", "numpy")
+
+def model_files(backend):
+    """Files a backend loads, e.g. for change detection and versioning."""
+    if backend == "sklearn":
+        return (MODEL_FILE,)
+    if backend == "booster":
+        return (NATIVE_MODEL_FILE, MANIFEST_FILE)
+    if backend == "numpy":
+        return (JSON_MODEL_FILE, MANIFEST_FILE)
+    raise ValueError(f"Unknown model backend '{backend}'. Choose one of: {', '.join(BACKENDS)}")
+
+def export_model(model):
+    """Save a fitted XGBClassifier's booster in native UBJ and JSON formats, plus the feature-order manifest."""
+    booster = model.get_booster()
+    booster.save_model(NATIVE_MODEL_FILE)
+    booster.save_model(JSON_MODEL_FILE)
+
+    manifest = {
+        "feature_names": list(booster.feature_names or FEATURE_COLUMNS),
+        "classes": [int(label) for label in model.classes_],
+        "objective": json.loads(booster.save_config())["learner"]["objective"]["name"],
+    }
+    tmp_path = f"{MANIFEST_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_FILE)
+
+def read_manifest():
+    """Load the manifest, checking the exported model expects features in FEATURE_COLUMNS order."""
+    with open(MANIFEST_FILE, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest["feature_names"] != FEATURE_COLUMNS:
+        raise ValueError(f"{MANIFEST_FILE} lists features in a different order than features.FEATURE_COLUMNS. Retrain the model.")
+    return manifest
+
+class BoosterModel:
+    """The native booster, predicting straight from NumPy arrays without the sklearn wrapper."""
+
+    def __init__(self, booster):
+        self.booster = booster
+
+    def predict_proba(self, features):
+        return self.booster.inplace_predict(np.asarray(features, dtype=np.float32))
+
+class NumpyTreeModel:
+    """A pure-NumPy evaluator for a multi:softprob tree ensemble exported as xgboost JSON.
+
+    All trees are packed into flat node arrays, so every tree is walked for every row at
+    once, one level per step. Splits follow xgboost: go left when value < threshold in
+    float32, and take the default branch for missing values.
+    """
+
+    ARRAY_NAMES = ("left", "right", "split_index", "threshold", "default_left", "roots", "tree_classes")
+
+    def __init__(self, left, right, split_index, threshold, default_left, roots, tree_classes, base_score):
+        self.left = left
+        self.right = right
+        self.split_index = split_index
+        self.threshold = threshold  # Leaves hold their value here
+        self.default_left = default_left
+        self.roots = roots
+        self.tree_classes = tree_classes  # Maps each tree's leaf value onto the class it boosts
+        self.base_score = base_score
+        self.is_leaf = self.left == -1
+        self.max_depth = self.depth()
+
+    @classmethod
+    def from_json(cls, model_json):
+        learner = model_json["learner"]
+        if learner["objective"]["name"] != "multi:softprob":
+            raise ValueError(f"The NumPy evaluator only supports multi:softprob models, not {learner['objective']['name']}")
+        gbtree = learner["gradient_booster"]["model"]
+        n_classes = int(learner["learner_model_param"]["num_class"])
+
+        left, right, split_index, threshold, default_left, roots = [], [], [], [], [], []
+        offset = 0
+        for tree in gbtree["trees"]:
+            n_nodes = len(tree["left_children"])
+            roots.append(offset)
+            left.extend(child + offset if child != -1 else -1 for child in tree["left_children"])
+            right.extend(child + offset if child != -1 else -1 for child in tree["right_children"])
+            split_index.extend(tree["split_indices"])
+            threshold.extend(tree["split_conditions"])
+            default_left.extend(tree["default_left"])
+            offset += n_nodes
+
+        tree_classes = np.zeros((len(roots), n_classes), dtype=np.float32)
+        tree_classes[np.arange(len(roots)), gbtree["tree_info"]] = 1
+        return cls(
+            np.array(left, dtype=np.int64), np.array(right, dtype=np.int64), np.array(split_index, dtype=np.int64),
+            np.array(threshold, dtype=np.float32), np.array(default_left, dtype=bool), np.array(roots, dtype=np.int64),
+            tree_classes, float(learner["learner_model_param"]["base_score"])
+        )
+
+    @classmethod
+    def from_arrays(cls, arrays, base_score):
+        """Rebuild a model from the arrays returned by to_arrays (e.g. memory-mapped ones)."""
+        return cls(*(arrays[name] for name in cls.ARRAY_NAMES), base_score)
+
+    def to_arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAY_NAMES}
+
+    def depth(self):
+        """Number of splits on the longest root-to-leaf path of any tree."""
+        nodes, depth = self.roots, 0
+        while not self.is_leaf[nodes].all():
+            nodes = nodes[~self.is_leaf[nodes]]
+            nodes = np.concatenate((self.left[nodes], self.right[nodes]))
+            depth += 1
+        return depth
+
+    def predict_proba(self, features):
+        features = np.asarray(features, dtype=np.float32)
+        rows = np.arange(len(features))[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (len(features), len(self.roots)))
+
+        for _ in range(self.max_depth):
+            values = features[rows, self.split_index[nodes]]
+            go_left = np.where(np.isnan(values), self.default_left[nodes], values < self.threshold[nodes])
+            nodes = np.where(self.is_leaf[nodes], nodes, np.where(go_left, self.left[nodes], self.right[nodes]))
+
+        margins = self.threshold[nodes] @ self.tree_classes + np.float32(self.base_score)
+        exp = np.exp(margins - margins.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+def load_model(backend):
+    """Load the model for a backend. Only the modules that backend needs are imported."""
+    model_files(backend)  # Validates the backend name
+    if backend == "sklearn":
+        import joblib
+        return joblib.load(MODEL_FILE)
+
+    read_manifest()
+    if backend == "booster":
+        import xgboost
+        booster = xgboost.Booster()
+        booster.load_model(NATIVE_MODEL_FILE)
+        return BoosterModel(booster)
+
+    with open(JSON_MODEL_FILE, encoding="utf-8") as f:
+        return NumpyTreeModel.from_json(json.load(f))
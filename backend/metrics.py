@@ -0,0 +1,183 @@
+import os
+import sys
+import time
+import bisect
+import logging
+import threading
+from collections import Counter
+
+# Upper bounds in seconds of the latency histogram buckets, from 50µs (a cache hit) to 10s (a cold reload)
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 10)
+
+def format_labels(label_names, label_values):
+    if not label_names:
+        return ""
+    pairs = []
+    for name, value in zip(label_names, label_values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+class Timer:
+    """Context manager that records its block's duration in a histogram."""
+
+    __slots__ = ("histogram", "label_values", "start")
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+
+class Histogram:
+    """Prometheus-style histogram: observation counts per bucket, plus their sum and count, per set of label values."""
+
+    def __init__(self, name, description, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self.series = {}  # label values -> [count per bucket (the last one +Inf), sum]
+        self.lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bucket] += 1
+            series[1] += value
+
+    def time(self, *label_values):
+        """Time a block: `with histogram.time("label"): ...`"""
+        return Timer(self, label_values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = {label_values: (list(counts), total) for label_values, (counts, total) in self.series.items()}
+        for label_values, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                labels = format_labels(self.label_names + ("le",), label_values + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class CallbackMetric:
+    """A counter or gauge whose samples are read when the metrics are rendered.
+
+    `collect` returns (label values, value) pairs, so figures kept elsewhere, like cache hit
+    counts or the loaded version, are exported without the hot path updating them twice.
+    """
+
+    def __init__(self, name, kind, description, label_names, collect):
+        self.name = name
+        self.kind = kind
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.collect = collect
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        for label_values, value in self.collect():
+            lines.append(f"{self.name}{format_labels(self.label_names, label_values)} {value}")
+        return lines
+
+class MetricsRegistry:
+    """The metrics one process exports, rendered in the Prometheus text format."""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self.metrics = []
+
+    def histogram(self, name, description, label_names=(), buckets=LATENCY_BUCKETS):
+        histogram = Histogram(name, description, label_names, buckets)
+        self.metrics.append(histogram)
+        return histogram
+
+    def callback(self, name, kind, description, label_names, collect):
+        self.metrics.append(CallbackMetric(name, kind, description, label_names, collect))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                logging.error(f"Could not collect {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    """Samples every thread's Python stack at a fixed interval and writes them as collapsed stacks.
+
+    Each output line is `thread;outermost frame;...;innermost frame count`, the input format of
+    flamegraph.pl, speedscope and similar tools. The file is rewritten with the totals so far
+    every `flush_interval` seconds and when stop() is called. Nothing runs unless start() is called.
+    """
+
+    def __init__(self, output_file, interval, flush_interval=10):
+        self.output_file = output_file
+        self.interval = interval
+        self.flush_interval = flush_interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="sampling-profiler", daemon=True)
+        self.thread.start()
+        logging.info(f"Sampling stacks every {self.interval * 1000:g}ms into {self.output_file}")
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.dump()
+
+    def sample(self):
+        own_id = threading.get_ident()
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            stack.append(thread_names.get(thread_id, str(thread_id)))
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def run(self):
+        next_flush = time.monotonic() + self.flush_interval
+        while not self.stopped.wait(self.interval):
+            self.sample()
+            if time.monotonic() >= next_flush:
+                self.dump()
+                next_flush = time.monotonic() + self.flush_interval
+
+    def dump(self):
+        """Write the collapsed stacks sampled so far."""
+        tmp_path = f"{self.output_file}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for stack, count in self.stacks.copy().items():
+                    f.write(f"{stack} {count}\n")
+            os.replace(tmp_path, self.output_file)
+        except OSError as e:
+            logging.error(f"Could not write {self.output_file}: {e}")
@@ -1,18 +1,23 @@
 import os
+import time
 import joblib
 import logging
+import argparse
+import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
+from joblib import Parallel, delayed
+from sklearn.model_selection import train_test_split, ParameterGrid, ParameterSampler
+from sklearn.metrics import accuracy_score, log_loss
 from xgboost import XGBClassifier
+from features import FEATURE_COLUMNS
+from inference import MODEL_FILE, export_model
+from storage import DEFAULT_COMPETITION, read_table, training_data_file, list_partitions
 
 # Logging Configuration
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 # File constants
-DATA_DIR = "Data"
-TRAINING_DATA_FILE = os.path.join(DATA_DIR, "training_data.csv")
-MODEL_FILE = "xgb_model.pkl"
+TUNING_RESULTS_FILE = "tuning_results.csv"
 
 # Model Hyperparameters
 XGB_PARAMS = {
@@ -22,33 +27,49 @@ XGB_PARAMS = {
     "eval_metric": "logloss"
 }
 
-def load_training_data(file_path):
-    """Load and validate training data from CSV."""
+# Tuning search space. n_estimators is an upper bound: early stopping picks the number of rounds
+PARAM_GRID = {
+    "n_estimators": [500],
+    "max_depth": [1, 2, 3, 4],
+    "learning_rate": [0.03, 0.1, 0.3],
+    "subsample": [0.8, 1.0],
+    "min_child_weight": [1, 5],
+}
+
+# Walk-forward cross-validation: folds, the share of each training window held out for
+# early stopping, and rounds without improvement before a candidate is stopped
+CV_FOLDS = 5
+EARLY_STOPPING_FRACTION = 0.2
+EARLY_STOPPING_ROUNDS = 20
+
+# Fits run at once while tuning; each fit gets an equal share of the remaining cores
+TUNING_WORKERS = int(os.environ.get("TUNING_WORKERS", os.cpu_count() or 1))
+
+CLASS_LABELS = [0, 1, 2]
+
+def load_training_data(file_path, columns=None):
+    """Load training data, reading only `columns` if given."""
     try:
-        data = pd.read_csv(file_path, index_col=0)
+        data = read_table(file_path, columns=columns)
         logging.info(f"Successfully loaded training data from {file_path}")
         return data
     except Exception as e:
         logging.error(f"Error loading training data: {e}")
         return None
 
+def load_partitions(competitions, seasons=None, columns=None):
+    """Load and concatenate the training data of the selected competition/season partitions."""
+    partitions = list_partitions(competitions, seasons)
+    frames = [load_training_data(training_data_file(competition, season), columns) for competition, season in partitions]
+    frames = [frame for frame in frames if frame is not None]
+    if not frames:
+        logging.error(f"No training data found for {', '.join(competitions)}. Run data_preprocessor.py first.")
+        return None
+    return pd.concat(frames, ignore_index=True)
+
 def get_features_and_target(data):
     """Prepare features and target variable for training."""
-    base_features = ["Home_Team_code", "Away_Team_code"]
-    home_features = [
-        "GF_rolling_home", "GA_rolling_home", "xG_rolling_home", "xGA_rolling_home", 
-        "Poss_rolling_home", "Sh_rolling_home", "SoT_rolling_home", "FK_rolling_home", "PKatt_rolling_home",
-        "GD_home", "Win%_home", "Draw%_home", "Loss%_home"
-    ]
-    away_features = [
-        "GF_rolling_away", "GA_rolling_away", "xG_rolling_away", "xGA_rolling_away", 
-        "Poss_rolling_away", "Sh_rolling_away", "SoT_rolling_away", "FK_rolling_away", "PKatt_rolling_away",
-        "GD_away", "Win%_away", "Draw%_away", "Loss%_away"
-    ]
-    
-    all_features = base_features + home_features + away_features
-
-    return data[all_features], data["Match_Result"]
+    return data[FEATURE_COLUMNS], data["Match_Result"]
 
 def train_model(x_train, y_train, params):
     """Train an XGBoost model and return it."""
@@ -63,19 +84,114 @@ def evaluate_model(model, x_test, y_test):
     logging.info(f"XGBoost Model Accuracy: {accuracy:.2f}")
     return accuracy
 
+def walk_forward_folds(dates, n_folds=CV_FOLDS):
+    """Split date-sorted rows into (train_idx, valid_idx) folds where each fold trains on every
+    date before a block of dates and validates on that block, so no fold sees the future."""
+    date_blocks = np.array_split(np.sort(dates.unique()), n_folds + 1)
+    folds = []
+    for block in date_blocks[1:]:
+        train_idx = np.flatnonzero(dates < block[0])
+        valid_idx = np.flatnonzero(dates.isin(block))
+        folds.append((train_idx, valid_idx))
+    return folds
+
+def evaluate_fold(params, features, target, train_idx, valid_idx, n_threads):
+    """Fit one candidate on one fold and score it on the fold's validation dates.
+
+    The latest EARLY_STOPPING_FRACTION of the training window is held out for early
+    stopping, so the validation block is only used for scoring.
+    """
+    n_fit = int(len(train_idx) * (1 - EARLY_STOPPING_FRACTION))
+    fit_idx, stop_idx = train_idx[:n_fit], train_idx[n_fit:]
+    model = XGBClassifier(**params, early_stopping_rounds=EARLY_STOPPING_ROUNDS, n_jobs=n_threads)
+
+    start = time.perf_counter()
+    model.fit(
+        features.iloc[fit_idx], target.iloc[fit_idx],
+        eval_set=[(features.iloc[stop_idx], target.iloc[stop_idx])], verbose=False
+    )
+    fit_time = time.perf_counter() - start
+
+    probabilities = model.predict_proba(features.iloc[valid_idx])
+    return {
+        "logloss": log_loss(target.iloc[valid_idx], probabilities, labels=CLASS_LABELS),
+        "accuracy": accuracy_score(target.iloc[valid_idx], probabilities.argmax(axis=1)),
+        "fit_time": fit_time,
+        "best_iteration": model.best_iteration,
+    }
+
+def search_candidates(search, n_iter, seed=None):
+    """Parameter sets to try: the full PARAM_GRID, or `n_iter` random draws from it."""
+    if search == "random":
+        candidates = ParameterSampler(PARAM_GRID, n_iter=n_iter, random_state=seed)
+    else:
+        candidates = ParameterGrid(PARAM_GRID)
+    # Early stopping evaluates the metric, and the outcome has three classes
+    return [{**XGB_PARAMS, "eval_metric": "mlogloss", **params} for params in candidates]
+
+def tune_model(data, candidates, n_workers=TUNING_WORKERS):
+    """Score every candidate with walk-forward cross-validation, running folds in parallel.
+
+    Each (candidate, fold) fit is a separate job. xgboost's `n_jobs` is set to the cores
+    left per worker, so the machine isn't oversubscribed. Returns one row per candidate,
+    best (lowest mean logloss) first.
+    """
+    data = data.sort_values("Date", kind="stable").reset_index(drop=True)
+    features, target = get_features_and_target(data)
+    folds = walk_forward_folds(data["Date"])
+    n_threads = max(1, (os.cpu_count() or 1) // n_workers)
+    logging.info(f"Tuning {len(candidates)} candidates over {len(folds)} folds with {n_workers} workers x {n_threads} threads")
+
+    tasks = [(i, train_idx, valid_idx) for i in range(len(candidates)) for train_idx, valid_idx in folds]
+    scores = Parallel(n_jobs=n_workers)(
+        delayed(evaluate_fold)(candidates[i], features, target, train_idx, valid_idx, n_threads)
+        for i, train_idx, valid_idx in tasks
+    )
+
+    fold_results = pd.DataFrame([{"candidate": i, **score} for (i, _, _), score in zip(tasks, scores)])
+    results = fold_results.groupby("candidate").agg(
+        logloss=("logloss", "mean"), logloss_std=("logloss", "std"), accuracy=("accuracy", "mean"),
+        fit_time=("fit_time", "sum"), best_iteration=("best_iteration", "mean")
+    )
+    params = pd.DataFrame(candidates).drop(columns=["n_estimators", "eval_metric"])
+    return params.join(results).sort_values("logloss").reset_index(drop=True)
+
+def train_best_model(data, results):
+    """Refit the best candidate on all data, with the number of rounds early stopping settled on."""
+    best = results.to_dict("records")[0]
+    params = {**XGB_PARAMS, **{name: best[name] for name in PARAM_GRID if name in best}}
+    params["n_estimators"] = int(round(best["best_iteration"])) + 1
+    logging.info(f"Best parameters: {params} (CV logloss {best['logloss']:.4f}, accuracy {best['accuracy']:.2f})")
+
+    feature_matrix, target = get_features_and_target(data)
+    return train_model(feature_matrix, target, params)
+
 def save_model(model, file_path):
-    """Save trained model to file."""
+    """Save trained model to file, along with the booster in xgboost's native formats for lean inference."""
     try:
         joblib.dump(model, file_path)
-        logging.info(f"Model saved as {file_path}")
+        export_model(model)
+        logging.info(f"Model saved as {file_path}, with native booster exports")
     except Exception as e:
         logging.error(f"Error saving model: {e}")
 
-def main():
-    """Main training pipeline."""
-    training_data = load_training_data(TRAINING_DATA_FILE)
+def train(competitions, seasons=None, tune=False, search="grid", n_iter=20, workers=TUNING_WORKERS):
+    """Train on the selected partitions, tuning hyperparameters first if asked, and save the model. Returns False if there was no data."""
+    columns = FEATURE_COLUMNS + ["Match_Result"] + (["Date"] if tune else [])
+    training_data = load_partitions(competitions, seasons, columns)
     if training_data is None:
-        return
+        return False
+
+    if tune:
+        training_data["Date"] = pd.to_datetime(training_data["Date"])
+        start = time.perf_counter()
+        results = tune_model(training_data, search_candidates(search, n_iter), workers)
+        logging.info(f"Tuning finished in {time.perf_counter() - start:.1f}s")
+
+        results.to_csv(TUNING_RESULTS_FILE, index=False)
+        logging.info(f"Tuning results saved to {TUNING_RESULTS_FILE}:\n{results.head(10).to_string(index=False)}")
+        save_model(train_best_model(training_data, results), MODEL_FILE)
+        return True
     
     # Train model
     feature_matrix, target = get_features_and_target(training_data)
@@ -84,6 +200,20 @@ def main():
 
     evaluate_model(xgb_model, x_test, y_test)
     save_model(xgb_model, MODEL_FILE)
+    return True
+
+def main():
+    """Main training pipeline."""
+    parser = argparse.ArgumentParser(description="Train the match outcome model on selected data partitions.")
+    parser.add_argument("--competitions", nargs="+", default=[DEFAULT_COMPETITION])
+    parser.add_argument("--seasons", nargs="+", help="Seasons to train on, e.g. 2023-2024 (default: all on disk)")
+    parser.add_argument("--tune", action="store_true", help="Search hyperparameters with walk-forward cross-validation")
+    parser.add_argument("--search", choices=["grid", "random"], default="grid")
+    parser.add_argument("--n-iter", type=int, default=20, help="Candidates to draw in random search")
+    parser.add_argument("--workers", type=int, default=TUNING_WORKERS, help="Fits to run in parallel while tuning")
+    args = parser.parse_args()
+
+    train(args.competitions, args.seasons, args.tune, args.search, args.n_iter, args.workers)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
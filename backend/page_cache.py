@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+class CachedPage:
+    """A page served through the cache.
+
+    `changed` is False when the content is identical to the copy last marked processed with
+    PageCache.mark_processed, so callers can skip re-parsing it. A page fetched but never
+    processed, e.g. because parsing or saving failed, stays changed until it is.
+    """
+
+    def __init__(self, url, text, changed, from_cache):
+        self.url = url
+        self.text = text
+        self.changed = changed
+        self.from_cache = from_cache
+
+class PageCache:
+    """On-disk HTTP response cache keyed by URL.
+
+    Each entry is a body file plus a JSON metadata file holding the ETag, Last-Modified,
+    content hash and fetch/access times. Entries younger than `ttl` seconds are served
+    without a request; older ones are revalidated with a conditional request. When the
+    cache grows past `max_bytes`, the least recently used entries are evicted. In
+    `replay` mode no requests are made and only cached pages are served.
+    """
+
+    def __init__(self, cache_dir, ttl, max_bytes, replay=False):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.replay = replay
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.html"), os.path.join(self.cache_dir, f"{key}.json")
+
+    def _write_json(self, path, data):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def get_meta(self, url):
+        """Return the metadata stored for `url`, or None if it isn't cached."""
+        body_path, meta_path = self._paths(url)
+        if not (os.path.exists(body_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, meta):
+        """Whether an entry is young enough to use without revalidating."""
+        return time.time() - meta["fetched_at"] < self.ttl
+
+    def conditional_headers(self, meta):
+        """Headers asking the server to reply 304 if the cached copy is still current."""
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def read(self, url, meta, changed=False, revalidated=False):
+        """Serve the cached body for `url`, recording the access for LRU eviction."""
+        changed = changed or meta.get("processed_hash") != meta.get("content_hash")
+        body_path, meta_path = self._paths(url)
+        with open(body_path, "rb") as f:
+            text = f.read().decode(meta.get("encoding") or "utf-8", errors="replace")
+
+        meta["accessed_at"] = time.time()
+        if revalidated:
+            meta["fetched_at"] = meta["accessed_at"]
+        self._write_json(meta_path, meta)
+        return CachedPage(url, text, changed, from_cache=True)
+
+    def store(self, url, response, previous_meta=None):
+        """Cache a 200 response and return it as a CachedPage."""
+        body_path, meta_path = self._paths(url)
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        previous_meta = previous_meta or {}
+        content_changed = previous_meta.get("content_hash") != content_hash
+        now = time.time()
+
+        meta = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_hash": content_hash,
+            "processed_hash": previous_meta.get("processed_hash"),
+            "encoding": response.encoding,
+            "size": len(response.content),
+            "fetched_at": now,
+            "accessed_at": now,
+            "extras": previous_meta.get("extras", {}) if not content_changed else {},
+        }
+
+        tmp_path = f"{body_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(response.content)
+        os.replace(tmp_path, body_path)
+        self._write_json(meta_path, meta)
+
+        self.evict()
+        return CachedPage(url, response.text, previous_meta.get("processed_hash") != content_hash, from_cache=False)
+
+    def mark_processed(self, url):
+        """Record that the cached content of `url` has been parsed and its data saved, so it counts as unchanged until it differs."""
+        meta = self.get_meta(url)
+        if meta is not None:
+            meta["processed_hash"] = meta["content_hash"]
+            self._write_json(self._paths(url)[1], meta)
+
+    def set_extra(self, url, key, value):
+        """Attach a value derived from a page (e.g. a link found in it) to its cache entry."""
+        meta = self.get_meta(url)
+        if meta is not None:
+            meta.setdefault("extras", {})[key] = value
+            self._write_json(self._paths(url)[1], meta)
+
+    def get_extra(self, url, key):
+        """Return a value previously attached with set_extra, or None."""
+        meta = self.get_meta(url)
+        return (meta or {}).get("extras", {}).get(key)
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits within max_bytes."""
+        with self.lock:
+            entries = []
+            for file_name in os.listdir(self.cache_dir):
+                if not file_name.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(self.cache_dir, file_name), encoding="utf-8") as f:
+                        meta = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                entries.append((meta.get("accessed_at", 0), meta.get("size", 0), meta.get("url")))
+
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, url in sorted(entries):
+                if total_size <= self.max_bytes:
+                    break
+                for path in self._paths(url):
+                    if os.path.exists(path):
+                        os.remove(path)
+                total_size -= size
+                logging.info(f"Evicted {url} from page cache")
@@ -0,0 +1,222 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+# Every stage reads and writes paths relative to the working directory, which main() sets to the backend folder
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+from storage import DEFAULT_COMPETITION, current_season, list_tables, team_match_data_dir, aggregated_file, training_data_file, list_partitions
+
+# Logging Configuration
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Latest run's stages, with the input and output hashes later runs compare against
+RUN_MANIFEST_FILE = "pipeline_manifest.json"
+
+STAGE_NAMES = ["scrape", "aggregate", "features", "train", "publish"]
+
+# Files hashed at once
+HASH_WORKERS = int(os.environ.get("PIPELINE_HASH_WORKERS", 4))
+
+class Stage:
+    """One pipeline step: the files it reads and writes, settings that change its result, and how to run it.
+
+    `inputs` and `outputs` are callables, since what a stage reads can depend on what earlier
+    stages wrote. `run` returns False when the stage could not do its work.
+    """
+
+    def __init__(self, name, inputs, outputs, run, params=None, always_run=False):
+        self.name = name
+        self.inputs = inputs
+        self.outputs = outputs
+        self.run = run
+        self.params = params or {}
+        self.always_run = always_run  # Reads from outside the repo (the web), so no input hash can vouch for it
+
+def file_hash(file_path):
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def hash_files(paths):
+    """Map each existing path to its content hash, hashing files in parallel. Missing files map to None."""
+    paths = sorted(set(paths))
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as executor:
+        hashes = executor.map(lambda path: file_hash(path) if os.path.exists(path) else None, paths)
+        return dict(zip(paths, hashes))
+
+def load_manifest():
+    """The previous run's manifest, or an empty one."""
+    if not os.path.exists(RUN_MANIFEST_FILE):
+        return {"stages": {}}
+    with open(RUN_MANIFEST_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(manifest):
+    tmp_path = f"{RUN_MANIFEST_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, RUN_MANIFEST_FILE)
+
+def is_current(stage, previous, input_hashes):
+    """Whether a stage's last successful run used these inputs and settings, and left outputs that are still intact."""
+    if stage.always_run or previous is None or previous["status"] not in ("ran", "skipped"):
+        return False
+    if previous["inputs"] != input_hashes or previous["params"] != stage.params:
+        return False
+    return bool(previous["outputs"]) and hash_files(previous["outputs"]) == previous["outputs"]
+
+def run_stage(stage, previous, force=False):
+    """Run a stage unless its inputs are unchanged since its last run. Returns its manifest entry."""
+    start = time.perf_counter()
+    input_hashes = hash_files(stage.inputs())
+    entry = {"inputs": input_hashes, "params": stage.params}
+
+    if not force and is_current(stage, previous, input_hashes):
+        logging.info(f"[{stage.name}] Inputs unchanged since the last run, skipping")
+        entry.update(status="skipped", outputs=previous["outputs"])
+    else:
+        logging.info(f"[{stage.name}] Running...")
+        try:
+            succeeded = stage.run() is not False
+        except Exception as e:
+            logging.error(f"[{stage.name}] Failed: {e}")
+            succeeded = False
+        output_hashes = hash_files(stage.outputs())
+        if succeeded and None in output_hashes.values():
+            missing = [path for path, digest in output_hashes.items() if digest is None]
+            logging.error(f"[{stage.name}] Did not produce {', '.join(missing)}")
+            succeeded = False
+        entry.update(status="ran" if succeeded else "failed", outputs=output_hashes)
+
+    entry["seconds"] = round(time.perf_counter() - start, 3)
+    logging.info(f"[{stage.name}] {entry['status']} in {entry['seconds']:.2f}s")
+    return entry
+
+def build_stages(competition, season, tune=False):
+    """The scrape -> aggregate -> features -> train -> publish stages for one competition season.
+
+    Scraping and aggregation cover `season`; features and training cover every season of the
+    competition on disk, as data_preprocessor and model_trainer do by default.
+    """
+    # The scraper reads its competition and season when imported
+    os.environ["SCRAPER_COMPETITION"] = competition
+    os.environ["SCRAPER_SEASON"] = season
+
+    def team_match_files():
+        folder = team_match_data_dir(competition, season)
+        return list_tables(folder) if os.path.isdir(folder) else []
+
+    def partition_files(file_for):
+        return [file_for(c, s) for c, s in list_partitions([competition])]
+
+    def scrape():
+        import webscraper
+        os.makedirs(team_match_data_dir(competition, season), exist_ok=True)
+        return webscraper.scrape(incremental=True) is not None
+
+    def aggregate():
+        import webscraper
+        if not team_match_files():
+            logging.error(f"No team match data for {competition} {season}.")
+            return False
+        webscraper.aggregate_data(team_match_data_dir(competition, season), aggregated_file(competition, season))
+
+    def features():
+        import data_preprocessor
+        import feature_store
+        if not data_preprocessor.preprocess([competition]):
+            return False
+
+        # Feature stores track matches by date and would miss the rebuilt history; /ingest rebuilds them on next use
+        for partition in list_partitions([competition]):
+            store_file = feature_store.feature_store_file(*partition)
+            if os.path.exists(store_file):
+                logging.info(f"Removing stale {store_file}")
+                os.remove(store_file)
+
+    def train():
+        import model_trainer
+        return model_trainer.train([competition], tune=tune)
+
+    def publish():
+        from serve import prepare_artifact
+        prepare_artifact()
+
+    from data_preprocessor import TEAM_DATA_FILE
+    from team_registry import TEAM_REGISTRY_FILE
+    from inference import MODEL_FILE, NATIVE_MODEL_FILE, JSON_MODEL_FILE, MANIFEST_FILE
+    from serving_artifact import SERVING_ARTIFACT_FILE
+    model_files = [MODEL_FILE, NATIVE_MODEL_FILE, JSON_MODEL_FILE, MANIFEST_FILE]
+
+    scope = {"competition": competition, "season": season}
+    return [
+        Stage("scrape", lambda: [], team_match_files, scrape, scope, always_run=True),
+        Stage("aggregate", team_match_files, lambda: [aggregated_file(competition, season)], aggregate, scope),
+        Stage("features", lambda: partition_files(aggregated_file),
+              lambda: partition_files(training_data_file) + [TEAM_DATA_FILE, TEAM_REGISTRY_FILE], features, {"competition": competition}),
+        Stage("train", lambda: partition_files(training_data_file), lambda: model_files, train, {"competition": competition, "tune": tune}),
+        Stage("publish", lambda: model_files + [TEAM_DATA_FILE], lambda: [SERVING_ARTIFACT_FILE], publish),
+    ]
+
+def run_pipeline(stages, force=False):
+    """Run stages in order, skipping those whose inputs are unchanged, and record the run. Returns the manifest.
+
+    Paths are relative to the working directory, as for the scripts each stage calls.
+    """
+    previous = load_manifest()["stages"]
+    manifest = {"started": time.strftime("%Y-%m-%dT%H:%M:%S"), "stages": {}}
+    start = time.perf_counter()
+
+    succeeded = True
+    for stage in stages:
+        entry = run_stage(stage, previous.get(stage.name), force)
+        manifest["stages"][stage.name] = entry
+        if entry["status"] == "failed":
+            logging.error(f"Stopping the pipeline after {stage.name} failed")
+            succeeded = False
+            break
+
+    # Stages not run this time keep their last record, so later runs can still skip them
+    for name, entry in previous.items():
+        manifest["stages"].setdefault(name, entry)
+
+    manifest["seconds"] = round(time.perf_counter() - start, 3)
+    manifest["succeeded"] = succeeded
+    save_manifest(manifest)
+    logging.info(f"Pipeline finished in {manifest['seconds']:.2f}s; run manifest saved to {os.path.abspath(RUN_MANIFEST_FILE)}")
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape, aggregate, build features, train and publish, redoing only stages whose inputs changed.")
+    parser.add_argument("--competition", default=DEFAULT_COMPETITION)
+    parser.add_argument("--season", help="Season to scrape and aggregate (default: the current season, or the latest on disk with --no-scrape)")
+    parser.add_argument("--stages", nargs="+", choices=STAGE_NAMES, default=STAGE_NAMES, help="Stages to run, in pipeline order")
+    parser.add_argument("--no-scrape", action="store_true", help="Work offline from the data already on disk")
+    parser.add_argument("--tune", action="store_true", help="Tune hyperparameters when training")
+    parser.add_argument("--force", action="store_true", help="Run every selected stage even if its inputs are unchanged")
+    args = parser.parse_args()
+
+    # Run from the backend folder wherever the command is started from; importing the module leaves the caller's directory alone
+    os.chdir(BACKEND_DIR)
+
+    season = args.season
+    if season is None:
+        seasons_on_disk = [s for _, s in list_partitions([args.competition])]
+        season = seasons_on_disk[-1] if args.no_scrape and seasons_on_disk else current_season()
+
+    selected = [name for name in args.stages if not (args.no_scrape and name == "scrape")]
+    stages = [stage for stage in build_stages(args.competition, season, args.tune) if stage.name in selected]
+    manifest = run_pipeline(stages, args.force)
+    sys.exit(0 if manifest["succeeded"] else 1)
+
+if __name__ == "__main__":
+    main()
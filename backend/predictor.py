@@ -1,118 +1,737 @@
 import os
-import joblib
-import pandas as pd
-from flask import Flask, request, jsonify, abort
+import hmac
+import time
+import atexit
+import hashlib
+import datetime
+import logging
+import threading
+import numpy as np
+from flask import Flask, request, jsonify, abort, g
 from flask_cors import CORS
+from features import TEAM_FEATURE_COLS
+import inference
+from inference import NumpyTreeModel
+from response_cache import ResponseCache
+from metrics import MetricsRegistry, SamplingProfiler
+import simulator
+from simulator import SeasonTable
+from serving_artifact import SERVING_ARTIFACT_FILE, read_artifact, write_artifact, artifact_lock
+from storage import DEFAULT_COMPETITION, table_path, read_table, partition_dir
+
+# Logging Configuration
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 # File constants
 DATA_DIR = "Data"
-TEAM_DATA_FILE = os.path.join(DATA_DIR, "team_data.csv")
-MODEL_FILE = "xgb_model.pkl"
+TEAM_DATA_FILE = table_path(os.path.join(DATA_DIR, "team_data"))
+
+# How the model is run: 'booster' (native booster, in-place predict), 'numpy' (pure-NumPy
+# tree evaluator, no xgboost import) or 'sklearn' (the pickled XGBClassifier)
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "booster")
+MODEL_FILES = inference.model_files(MODEL_BACKEND)
+
+# Team data columns used to serve predictions and /teams
+TEAM_DATA_COLS = ["Team_Code", "Team_Name", "Logo", "Wins", "Draws", "Losses"] + TEAM_FEATURE_COLS
+
+# Upper bound on the number of fixtures scored by a single batch request
+MAX_BATCH_SIZE = 1000
+
+# Upper bound on the number of seasons sampled by a single /simulate request
+MAX_SIMULATIONS = 200000
+
+# Score every home/away pairing up front and answer predictions by lookup
+PRECOMPUTE_PREDICTIONS = os.environ.get("PRECOMPUTE_PREDICTIONS", "1") == "1"
+
+# Watch the model and team data files and reload them in the background when they change
+WATCH_ARTIFACTS = os.environ.get("WATCH_ARTIFACTS", "1") == "1"
+
+# Seconds between checks for a changed model or team data file
+ARTIFACT_CHECK_INTERVAL = 5
+
+# Serve from the memory-mapped serving artifact and load in the background, so the server
+# answers (e.g. /health) before the model and data are ready. pandas and xgboost are only
+# imported when the artifact is missing or stale and has to be rebuilt
+FAST_STARTUP = os.environ.get("FAST_STARTUP", "0") == "1"
+
+# Seconds a request waits for warm-up to finish before getting a 503
+WARMUP_TIMEOUT = 30
+
+# Serialized /teams, /predict and /predict/matrix responses kept per process, and the seconds
+# browsers and CDNs may reuse a GET response before revalidating it with If-None-Match
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 1024))
+RESPONSE_MAX_AGE = int(os.environ.get("RESPONSE_MAX_AGE", 60))
+
+# Opt-in sampling profiler: collapsed stacks of every thread, sampled every PROFILE_INTERVAL_MS,
+# are written to PROFILE_STACKS_FILE. A {pid} in the file name is replaced by the process ID
+PROFILE_STACKS_FILE = os.environ.get("PROFILE_STACKS_FILE")
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", 10))
+
+# Response header carrying the version of the artifacts that served the request
+VERSION_HEADER = "X-Artifact-Version"
+
+# /ingest and /reload change what is served. With ADMIN_TOKEN set they require it in the
+# X-Admin-Token header; without it they only answer non-browser requests from this machine
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+ADMIN_ENDPOINTS = ("/ingest", "/reload")
+LOOPBACK_ADDRESSES = ("127.0.0.1", "::1")
 
 app = Flask(__name__)
-CORS(app)
+# Cross-origin access is for the read endpoints the web UI uses; the admin endpoints are left out
+CORS(app, resources={rf"^(?!({'|'.join(ADMIN_ENDPOINTS)})$).*": {}}, expose_headers=[VERSION_HEADER])
+
+class TeamIndex:
+    """Per-team model inputs and /teams payload, built once from team_data.
+
+    Row i of `features` holds Team_Code followed by TEAM_FEATURE_COLS for the team
+    whose name maps to i in `rows`, so a fixture's feature vector is a gather of two
+    rows in the same column order as model_trainer.get_features_and_target.
+    """
+
+    def __init__(self, features, team_names, teams):
+        self.features = features
+        self.rows = {name: i for i, name in enumerate(team_names)}
+        self.teams = teams
+
+    @classmethod
+    def from_team_data(cls, team_data):
+        features = np.ascontiguousarray(team_data[["Team_Code"] + TEAM_FEATURE_COLS].to_numpy(dtype=np.float32))
+        teams = [
+            {
+                "team_name": row.Team_Name,
+                "logo_url": row.Logo,
+                "wins": int(row.Wins),
+                "draws": int(row.Draws),
+                "losses": int(row.Losses),
+                "goal_differential": int(row.GD),
+                "last_5_matches": [] # Placeholder, can be updated with actual match history
+            }
+            for row in team_data.itertuples(index=False)
+        ]
+        return cls(features, list(team_data["Team_Name"]), teams)
+
+    def with_team_rows(self, team_rows):
+        """A copy with some teams' features and /teams records replaced by their new team_data rows (dicts)."""
+        features = self.features.copy()
+        teams = list(self.teams)
+        for row in team_rows:
+            i = self.rows[row["Team_Name"]]
+            features[i] = [row["Team_Code"]] + [row[col] for col in TEAM_FEATURE_COLS]
+            teams[i] = {
+                **teams[i],
+                "logo_url": row["Logo"] if isinstance(row["Logo"], str) else teams[i]["logo_url"],
+                "wins": int(row["Wins"]),
+                "draws": int(row["Draws"]),
+                "losses": int(row["Losses"]),
+                "goal_differential": int(row["GD"]),
+            }
+        return TeamIndex(features, list(self.rows), teams)
+
+    def pair_features(self, home_row, away_row):
+        """Return the 1 x n_features model input for a single fixture."""
+        home = self.features[home_row]
+        away = self.features[away_row]
+        return np.concatenate((home[:1], away[:1], home[1:], away[1:]))[np.newaxis, :]
+
+    def batch_features(self, home_rows, away_rows):
+        """Gather model inputs for every (home, away) pair of team rows in one pass."""
+        home = self.features[home_rows]
+        away = self.features[away_rows]
+        return np.hstack([home[:, :1], away[:, :1], home[:, 1:], away[:, 1:]])
+
+    def all_pair_rows(self):
+        """Return (home_rows, away_rows) covering every cell of the N x N team grid in row-major order."""
+        n_teams = len(self.rows)
+        return np.repeat(np.arange(n_teams), n_teams), np.tile(np.arange(n_teams), n_teams)
+
+class ServingState:
+    """One consistent, fully loaded set of artifacts used to answer requests.
+
+    A state is never modified after construction. Reloads build a new state and
+    replace the module-level `state` reference in a single assignment, so a request
+    that grabbed the old state keeps using it until it finishes.
+    """
+
+    def __init__(self, model, backend, team_index, prediction_matrix, mtimes, version):
+        self.model = model
+        self.backend = backend
+        self.team_index = team_index
+        self.prediction_matrix = prediction_matrix
+        self.mtimes = mtimes
+        self.version = version
+
+    def predict_rows(self, home_rows, away_rows):
+        """Return class probabilities for each (home, away) pair of team rows."""
+        if self.prediction_matrix is not None:
+            return self.prediction_matrix[home_rows, away_rows]
+        return self.model.predict_proba(self.team_index.batch_features(home_rows, away_rows))
 
 def load_model():
-    """Load and return the trained model."""
-    if not os.path.exists(MODEL_FILE):
+    """Load and return the trained model for the configured backend."""
+    if not all(os.path.exists(path) for path in MODEL_FILES):
         abort(500, "Model file not found. Train the model first.")
-    return joblib.load(MODEL_FILE)
+    return inference.load_model(MODEL_BACKEND)
 
 def load_team_data():
     """Load and return team data as a DataFrame."""
     if not os.path.exists(TEAM_DATA_FILE):
         abort(500, "Team data file not found.")
-    return pd.read_csv(TEAM_DATA_FILE)
+    return read_table(TEAM_DATA_FILE, columns=TEAM_DATA_COLS)
 
-# Load model and team data
-model = load_model()
-team_data = load_team_data()
+def build_prediction_matrix(model, team_index):
+    """Score every home/away pairing with one predict_proba call.
 
-@app.route("/teams", methods=["GET"])
-def get_teams():
-    """Returns all team names along with their logo URLs, records, and last 5 matches."""
-    teams_list = []
+    Returns an N x N x 3 float32 array where [home_row, away_row] holds the class
+    probabilities (away win, draw, home win) for that fixture.
+    """
+    n_teams = len(team_index.rows)
+    features = team_index.batch_features(*team_index.all_pair_rows())
+    probabilities = model.predict_proba(features)
+    return probabilities.astype(np.float32).reshape(n_teams, n_teams, -1)
+
+def artifact_mtimes():
+    """Return the modification times of the files predictions depend on."""
+    return tuple(os.path.getmtime(path) for path in MODEL_FILES + (TEAM_DATA_FILE,))
+
+def artifact_version():
+    """Return a short content hash identifying the current model and team data files."""
+    digest = hashlib.sha256()
+    for path in MODEL_FILES + (TEAM_DATA_FILE,):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+def save_artifact(state):
+    """Write a state's team index, prediction matrix and trees to the serving artifact."""
+    model = state.model
+    if not isinstance(model, NumpyTreeModel):
+        if not os.path.exists(inference.JSON_MODEL_FILE):
+            logging.warning(f"{inference.JSON_MODEL_FILE} not found; retrain the model to enable the serving artifact.")
+            return
+        model = inference.load_model("numpy")
+
+    prediction_matrix = state.prediction_matrix
+    if prediction_matrix is None:
+        prediction_matrix = build_prediction_matrix(state.model, state.team_index)
+
+    header = {
+        "version": state.version,
+        "team_names": list(state.team_index.rows),
+        "teams": state.team_index.teams,
+        "base_score": model.base_score,
+    }
+    arrays = {"team_features": state.team_index.features, "prediction_matrix": prediction_matrix}
+    arrays.update({f"tree_{name}": array for name, array in model.to_arrays().items()})
+    write_artifact(SERVING_ARTIFACT_FILE, header, arrays)
+
+def load_artifact_state(mtimes, version):
+    """Map the serving artifact, or return None if it is missing or was built from other files."""
+    if not os.path.exists(SERVING_ARTIFACT_FILE):
+        return None
+    try:
+        header, arrays = read_artifact(SERVING_ARTIFACT_FILE)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Could not read {SERVING_ARTIFACT_FILE}: {e}")
+        return None
+    if header["version"] != version:
+        logging.info(f"{SERVING_ARTIFACT_FILE} is out of date, rebuilding it")
+        return None
+
+    team_index = TeamIndex(arrays["team_features"], header["team_names"], header["teams"])
+    tree_arrays = {name: arrays[f"tree_{name}"] for name in NumpyTreeModel.ARRAY_NAMES}
+    model = NumpyTreeModel.from_arrays(tree_arrays, header["base_score"])
+    prediction_matrix = arrays["prediction_matrix"] if PRECOMPUTE_PREDICTIONS else None
+    return ServingState(model, "numpy", team_index, prediction_matrix, mtimes, version)
+
+def build_state(mtimes, version):
+    """Load the model and team data and derive everything served from them."""
+    model = load_model()
+    team_index = TeamIndex.from_team_data(load_team_data())
+    prediction_matrix = build_prediction_matrix(model, team_index) if PRECOMPUTE_PREDICTIONS else None
+    return ServingState(model, MODEL_BACKEND, team_index, prediction_matrix, mtimes, version)
+
+def load_state():
+    """Load the model and team data along with everything derived from them.
+
+    With FAST_STARTUP, the serving artifact is mapped instead when it was built from the
+    current files; otherwise it is rebuilt first. Processes serving from the same artifact
+    share its memory, and the lock lets one of them rebuild it while the others wait.
+    """
+    mtimes = artifact_mtimes()
+    version = artifact_version()
+    if not FAST_STARTUP:
+        return build_state(mtimes, version)
+
+    with artifact_lock(SERVING_ARTIFACT_FILE):
+        artifact_state = load_artifact_state(mtimes, version)
+        if artifact_state is None:
+            new_state = build_state(mtimes, version)
+            save_artifact(new_state)
+            artifact_state = load_artifact_state(mtimes, version) or new_state
+    return artifact_state
+
+def refresh_teams(current, team_rows):
+    """A new state with some teams' features replaced, rescoring only the pairings those teams play in.
+
+    Raises KeyError if a team isn't in the current state.
+    """
+    team_index = current.team_index.with_team_rows(team_rows)
+    prediction_matrix = current.prediction_matrix
+    if prediction_matrix is not None:
+        n_teams = len(team_index.rows)
+        changed = np.array([team_index.rows[row["Team_Name"]] for row in team_rows])
+        everyone = np.tile(np.arange(n_teams), len(changed))
+        home_rows = np.concatenate([np.repeat(changed, n_teams), everyone])
+        away_rows = np.concatenate([everyone, np.repeat(changed, n_teams)])
+        prediction_matrix = np.array(prediction_matrix)  # The current matrix may be a read-only mapping
+        prediction_matrix[home_rows, away_rows] = current.model.predict_proba(team_index.batch_features(home_rows, away_rows))
+    return ServingState(current.model, current.backend, team_index, prediction_matrix, artifact_mtimes(), artifact_version())
+
+def format_probabilities(probabilities):
+    """Convert class probabilities (away win, draw, home win) into response percentages."""
+    return {
+        "home_win": round(float(probabilities[2]) * 100, 2),
+        "draw": round(float(probabilities[1]) * 100, 2),
+        "away_win": round(float(probabilities[0]) * 100, 2),
+    }
+
+# Loaded below, or by the warm-up thread with FAST_STARTUP
+state = None
+state_ready = threading.Event()
+reload_lock = threading.Lock()
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE)
+
+# Exported at /metrics
+metrics_registry = MetricsRegistry()
+request_seconds = metrics_registry.histogram(
+    "predictor_request_duration_seconds", "Time to handle a request.", ("endpoint", "method", "status"))
+stage_seconds = metrics_registry.histogram(
+    "predictor_stage_duration_seconds", "Time spent in each step of answering requests and loading artifacts.", ("stage",))
+metrics_registry.callback("predictor_response_cache_hits_total", "counter", "Response cache lookups that found an entry.", (),
+                          lambda: [((), response_cache.hits)])
+metrics_registry.callback("predictor_response_cache_misses_total", "counter", "Response cache lookups that found no entry.", (),
+                          lambda: [((), response_cache.misses)])
+metrics_registry.callback("predictor_response_cache_entries", "gauge", "Responses currently cached.", (),
+                          lambda: [((), len(response_cache.entries))])
+metrics_registry.callback("predictor_artifact_info", "gauge", "Version of the model and team data being served.", ("version", "model_backend"),
+                          lambda: [((state.version, state.backend), 1)] if state else [])
+metrics_registry.callback("predictor_artifact_modified_timestamp_seconds", "gauge", "Newest modification time of the served model and team data files.", (),
+                          lambda: [((), max(state.mtimes))] if state else [])
+metrics_registry.callback("predictor_teams", "gauge", "Teams that can be predicted.", (),
+                          lambda: [((), len(state.team_index.rows))] if state else [])
+metrics_registry.callback("predictor_ready", "gauge", "Whether the model and team data have finished loading.", (),
+                          lambda: [((), int(state is not None))])
+
+def reload_state(wait=False):
+    """Load fresh artifacts and swap them in. Returns False if a reload is already running and `wait` is not set."""
+    global state
+
+    if not reload_lock.acquire(blocking=wait):
+        return False
+    try:
+        with stage_seconds.time("load_state"):
+            new_state = load_state()
+        if state is None or new_state.version != state.version:
+            logging.info(f"Serving artifacts version {new_state.version}")
+            response_cache.clear()
+        state = new_state
+    except Exception as e:
+        logging.error(f"Reload failed, keeping version {state.version if state else None}: {e}")
+    finally:
+        reload_lock.release()
+    return True
+
+def apply_team_update(team_rows):
+    """Swap in a state with some teams' new team_data rows, already written to team_data. Returns the new state."""
+    global state
+
+    with reload_lock:
+        try:
+            with stage_seconds.time("refresh_teams"):
+                new_state = refresh_teams(state, team_rows)
+        except KeyError:
+            new_state = load_state()  # A team new to team_data needs a full reload
+        else:
+            if FAST_STARTUP:
+                # Keep the artifact current, so other processes map it instead of rebuilding it
+                with artifact_lock(SERVING_ARTIFACT_FILE):
+                    save_artifact(new_state)
+                    new_state = load_artifact_state(new_state.mtimes, new_state.version) or new_state
+        logging.info(f"Refreshed {', '.join(row['Team_Name'] for row in team_rows)}; serving artifacts version {new_state.version}")
+        response_cache.clear()
+        state = new_state
+    return new_state
 
-    for _, row in team_data.iterrows():
-        team_info = {
-            "team_name": row["Team_Name"],
-            "logo_url": row["Logo"],
-            "wins": int(row["Wins"]),
-            "draws": int(row["Draws"]),
-            "losses": int(row["Losses"]),
-            "goal_differential": int(row["GD"]),
-            "last_5_matches": [] # Placeholder, can be updated with actual match history
-        }
+def watch_artifacts():
+    """Poll artifact mtimes and reload in the background whenever they change."""
+    while True:
+        time.sleep(ARTIFACT_CHECK_INTERVAL)
+        try:
+            changed = state is None or artifact_mtimes() != state.mtimes
+        except OSError:
+            continue  # A file is mid-replace; check again next time
+        if changed:
+            reload_state()
 
-        teams_list.append(team_info)
+def warm_up():
+    """Load the serving state, then let waiting requests through."""
+    reload_state(wait=True)
+    state_ready.set()
 
-    return jsonify({"teams": teams_list})
+if FAST_STARTUP:
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+else:
+    with stage_seconds.time("load_state"):
+        state = load_state()
+    state_ready.set()
 
-@app.route("/predict", methods=["POST"])
+if WATCH_ARTIFACTS:
+    threading.Thread(target=watch_artifacts, name="artifact-watcher", daemon=True).start()
+
+if PROFILE_STACKS_FILE:
+    profiler = SamplingProfiler(PROFILE_STACKS_FILE.replace("{pid}", str(os.getpid())), PROFILE_INTERVAL_MS / 1000).start()
+    atexit.register(profiler.stop)
+
+def current_state():
+    """Return the state serving this request, pinned for the request's lifetime. Waits for warm-up if needed."""
+    if "state" not in g:
+        if state is None:
+            state_ready.wait(WARMUP_TIMEOUT)
+        if state is None:
+            abort(503, "Model and team data are not loaded yet.")
+        g.state = state
+    return g.state
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_duration(response):
+    """Observe each request's latency under its route, so /predict?home_team=... is one series."""
+    if "request_start" in g:
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        request_seconds.observe(time.perf_counter() - g.request_start, endpoint, request.method, response.status_code)
+    return response
+
+@app.after_request
+def add_version_header(response):
+    """Tag each response with the artifact version that produced it."""
+    current = g.get("state", state)
+    if current is not None:
+        response.headers[VERSION_HEADER] = current.version
+    return response
+
+def cached_response(endpoint, params, build_payload):
+    """Serve a JSON payload that depends only on the loaded artifacts and `params`.
+
+    The body is built and serialized once per artifact version and kept in the LRU response
+    cache. GET responses carry a strong ETag and Cache-Control, and a matching If-None-Match
+    gets an empty 304.
+    """
+    current = current_state()
+    key = (endpoint, params, current.version)
+    with stage_seconds.time("cache_lookup"):
+        entry = response_cache.get(key)
+    if entry is None:
+        payload = build_payload(current)
+        with stage_seconds.time("serialize"):
+            entry = response_cache.put(key, app.json.response(payload).get_data())
+
+    if request.method != "GET":
+        return app.response_class(entry.body, mimetype="application/json")
+
+    if request.if_none_match.contains(entry.etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(entry.body, mimetype="application/json")
+    response.set_etag(entry.etag)
+    response.headers["Cache-Control"] = f"public, max-age={RESPONSE_MAX_AGE}"
+    return response
+
+@app.route("/health", methods=["GET"])
+def health():
+    """Answers immediately, reporting whether the model and team data have finished loading."""
+    current = state
+    return jsonify({"status": "ok", "ready": current is not None, "version": current.version if current else None})
+
+@app.route("/teams", methods=["GET"])
+def get_teams():
+    """Returns all team names along with their logo URLs, records, and last 5 matches."""
+    return cached_response("teams", (), lambda current: {"teams": current.team_index.teams, "version": current.version})
+
+@app.route("/predict", methods=["GET", "POST"])
 def predict():
-    data = request.json
+    """Predicts one fixture, from a JSON body or (cacheably) from GET query parameters."""
+    data = request.args if request.method == "GET" else request.get_json(silent=True)
 
-    if not data or "home_team" not in data or "away_team" not in data:
+    if not isinstance(data, dict) or "home_team" not in data or "away_team" not in data:
         abort(400, "Both 'home_team' and 'away_team' must be provided.")
-    
-    # Get team data from team name
-    home_team_data = team_data.loc[team_data["Team_Name"] == data.get("home_team")]
-    away_team_data = team_data.loc[team_data["Team_Name"] == data.get("away_team")]
+
+    home_team, away_team = data.get("home_team"), data.get("away_team")
+    if not isinstance(home_team, str) or not isinstance(away_team, str):
+        abort(400, "'home_team' and 'away_team' must be team names.")
+    if home_team == away_team:
+        abort(400, "'home_team' and 'away_team' must differ.")
+    return cached_response("predict", (home_team, away_team), lambda current: predict_payload(current, home_team, away_team))
+
+def predict_payload(current, home_team, away_team):
+    """The /predict response for one fixture."""
+    # Look up each team's row in the index
+    with stage_seconds.time("lookup"):
+        home_row = current.team_index.rows.get(home_team)
+        away_row = current.team_index.rows.get(away_team)
 
     # Ensure team data exists
-    if home_team_data.empty or away_team_data.empty:
+    if home_row is None or away_row is None:
          abort(400, "One or both teams not found in team_data.csv")
 
-    # Convert Team_Code to int
-    home_team_code = int(home_team_data["Team_Code"].values[0])
-    away_team_code = int(away_team_data["Team_Code"].values[0])
+    try:
+        if current.prediction_matrix is not None:
+            with stage_seconds.time("matrix_lookup"):
+                probabilities = current.prediction_matrix[home_row, away_row]
+        else:
+            with stage_seconds.time("features"):
+                features = current.team_index.pair_features(home_row, away_row)
+            with stage_seconds.time("predict_proba"):
+                probabilities = current.model.predict_proba(features)[0]
+        response = format_probabilities(probabilities)
+    except Exception as e:
+        abort(500, f"Prediction failed: {str(e)}")
+
+    response["version"] = current.version
+    return response
+
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    """Predicts outcomes for a list of fixtures with a single model call."""
+    current = current_state()
+    team_rows = current.team_index.rows
+    data = request.get_json(silent=True)
+
+    if not isinstance(data, dict) or not isinstance(data.get("matches"), list):
+        abort(400, "A list of 'matches' must be provided.")
+
+    matches = data["matches"]
+    if len(matches) > MAX_BATCH_SIZE:
+        abort(400, f"At most {MAX_BATCH_SIZE} matches can be predicted per request.")
+
+    # Resolve team rows, recording errors inline so one bad pair doesn't fail the batch
+    results = []
+    valid_indices, home_rows, away_rows = [], [], []
+    for i, match in enumerate(matches):
+        if not isinstance(match, dict):
+            results.append({"home_team": None, "away_team": None, "error": "Each match must be an object with 'home_team' and 'away_team'."})
+            continue
+
+        home_team, away_team = match.get("home_team"), match.get("away_team")
+        results.append({"home_team": home_team, "away_team": away_team})
+
+        if not home_team or not away_team:
+            results[i]["error"] = "Both 'home_team' and 'away_team' must be provided."
+            continue
 
-    # Extract rolling averages and cumulative stats for both teams
-    rolling_avg_cols = [
-        "GF_rolling", "GA_rolling", "xG_rolling", "xGA_rolling",
-        "Poss_rolling", "Sh_rolling", "SoT_rolling", "FK_rolling", "PKatt_rolling"
-    ]
-    cumulative_cols = ["GD", "Win%", "Draw%", "Loss%"]
+        if not isinstance(home_team, str) or not isinstance(away_team, str):
+            results[i]["error"] = "'home_team' and 'away_team' must be team names."
+            continue
 
-    home_rolling_avg = home_team_data[rolling_avg_cols].astype(float).values[0]
-    home_cumulative = home_team_data[cumulative_cols].astype(float).values[0]
+        if home_team == away_team:
+            results[i]["error"] = "'home_team' and 'away_team' must differ."
+            continue
 
-    away_rolling_avg = away_team_data[rolling_avg_cols].astype(float).values[0]
-    away_cumulative = away_team_data[cumulative_cols].astype(float).values[0]
+        unknown_teams = [team for team in (home_team, away_team) if team not in team_rows]
+        if unknown_teams:
+            results[i]["error"] = f"Team not found in team_data.csv: {', '.join(unknown_teams)}"
+            continue
 
-    # Create feature dictionary
-    features_dict = {
-        "Home_Team_code": home_team_code,
-        "Away_Team_code": away_team_code
+        valid_indices.append(i)
+        home_rows.append(team_rows[home_team])
+        away_rows.append(team_rows[away_team])
+
+    if valid_indices:
+        try:
+            with stage_seconds.time("batch_predict"):
+                probabilities = current.predict_rows(home_rows, away_rows)
+        except Exception as e:
+            abort(500, f"Prediction failed: {str(e)}")
+
+        for i, match_probabilities in zip(valid_indices, probabilities):
+            results[i].update(format_probabilities(match_probabilities))
+
+    return jsonify({"predictions": results, "version": current.version})
+
+@app.route("/predict/matrix", methods=["GET"])
+def predict_matrix():
+    """Returns win/draw/loss percentages for every home/away pairing.
+
+    Grids are indexed [home][away] following the order of `teams`; a team against itself is null.
+    """
+    return cached_response("matrix", (), matrix_payload)
+
+def matrix_payload(current):
+    """The /predict/matrix response."""
+    team_index = current.team_index
+    if current.prediction_matrix is not None:
+        probabilities = current.prediction_matrix
+    else:
+        n_teams = len(team_index.rows)
+        probabilities = current.predict_rows(*team_index.all_pair_rows()).reshape(n_teams, n_teams, -1)
+
+    percentages = np.round(probabilities.astype(float) * 100, 2)
+    self_pairings = np.eye(len(team_index.rows), dtype=bool)
+
+    def grid(class_index):
+        values = np.where(self_pairings, np.nan, percentages[:, :, class_index]).tolist()
+        return [[None if np.isnan(value) else value for value in row] for row in values]
+
+    return {
+        "teams": list(team_index.rows),
+        "home_win": grid(2),
+        "draw": grid(1),
+        "away_win": grid(0),
+        "version": current.version,
     }
 
-    # Add rolling average and cumulative stats for home and away teams
-    for i, col in enumerate(rolling_avg_cols):
-        features_dict[f"{col}_home"] = home_rolling_avg[i]
+@app.route("/simulate", methods=["POST"])
+def simulate_season():
+    """Simulates the rest of a season from the model's probabilities for each remaining fixture.
+
+    Returns each team's expected points, title, top-four and relegation chances, and finishing
+    place distribution. Remaining fixtures default to the double round robin minus matches played.
+    """
+    current = current_state()
+    data = request.get_json(silent=True)
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        abort(400, "The request body must be a JSON object.")
 
-    for i, col in enumerate(cumulative_cols):
-        features_dict[f"{col}_home"] = home_cumulative[i]
+    competition = data.get("competition", DEFAULT_COMPETITION)
+    if not isinstance(competition, str) or not isinstance(data.get("season") or "", str):
+        abort(400, "'competition' and 'season' must be strings.")
+    season = data.get("season") or simulator.latest_season(competition)
+    n_simulations = data.get("simulations", simulator.DEFAULT_SIMULATIONS)
+    if not isinstance(n_simulations, int) or isinstance(n_simulations, bool) or not 0 < n_simulations <= MAX_SIMULATIONS:
+        abort(400, f"'simulations' must be an integer from 1 to {MAX_SIMULATIONS}.")
 
-    for i, col in enumerate(rolling_avg_cols):
-        features_dict[f"{col}_away"] = away_rolling_avg[i]
+    seed = data.get("seed")
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)):
+        abort(400, "'seed' must be an integer.")
 
-    for i, col in enumerate(cumulative_cols):
-        features_dict[f"{col}_away"] = away_cumulative[i]
+    if season is None:
+        abort(404, f"No match data found for {competition}.")
+    try:
+        table = SeasonTable.load(competition, season)
+    except FileNotFoundError:
+        abort(404, f"No match data found for {competition} {season}.")
 
-    # Create DataFrame from extracted data
-    features = pd.DataFrame([features_dict])
+    fixtures = data.get("fixtures")
+    if fixtures is None:
+        fixtures = table.remaining_fixtures()
+    elif not isinstance(fixtures, list) or not all(
+        isinstance(f, dict) and isinstance(f.get("home_team"), str) and isinstance(f.get("away_team"), str) for f in fixtures
+    ):
+        abort(400, "'fixtures' must be a list of {'home_team', 'away_team'} pairs.")
+    else:
+        fixtures = [(fixture["home_team"], fixture["away_team"]) for fixture in fixtures]
 
     try:
-        probabilities = model.predict_proba(features)[0]
-        response = {
-            "home_win": round(float(probabilities[2]) * 100, 2),
-            "draw": round(float(probabilities[1]) * 100, 2),
-            "away_win": round(float(probabilities[0]) * 100, 2),
-        }
-    except Exception as e:
-        abort(500, f"Prediction failed: {str(e)}")
+        summary = simulator.simulate_season(current, table, fixtures, n_simulations, seed, simulator.SIMULATION_WORKERS)
+    except ValueError as e:
+        abort(400, str(e))
+
+    return jsonify({
+        "competition": competition,
+        "season": season,
+        "simulations": n_simulations,
+        "fixtures_remaining": len(fixtures),
+        "teams": summary,
+        "version": current.version,
+    })
+
+def require_admin():
+    """Abort unless the request may use an admin endpoint."""
+    if ADMIN_TOKEN:
+        if not hmac.compare_digest(request.headers.get(ADMIN_TOKEN_HEADER, ""), ADMIN_TOKEN):
+            abort(401, f"A valid {ADMIN_TOKEN_HEADER} header is required.")
+        return
+    # Browsers send Origin with every POST, so a page the user visits can't reach these through localhost either
+    if request.remote_addr not in LOOPBACK_ADDRESSES or "Origin" in request.headers:
+        abort(403, f"Set ADMIN_TOKEN to use {request.path} from other hosts; without it only local, non-browser requests are allowed.")
+
+def is_count(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+def is_stat(value):
+    return value is None or (isinstance(value, (int, float)) and not isinstance(value, bool))
+
+@app.route("/ingest", methods=["POST"])
+def ingest_result():
+    """Records a finished match and refreshes both teams' predictions without a full reload.
+
+    The result is folded into the partition's feature store, training data, aggregated match
+    data and team_data. Only the two teams' rows and the pairings they play in are then rescored.
+    """
+    require_admin()
+    current_state()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not all(isinstance(data.get(key), str) for key in ("date", "home_team", "away_team")):
+        abort(400, "'date', 'home_team' and 'away_team' must be provided.")
+    if data["home_team"] == data["away_team"]:
+        abort(400, "'home_team' and 'away_team' must differ.")
+    try:
+        date = datetime.date.fromisoformat(data["date"]).isoformat()
+    except ValueError:
+        abort(400, "'date' must be an ISO date, e.g. 2025-03-01.")
+    if not isinstance(data.get("competition", ""), str) or not isinstance(data.get("season") or "", str):
+        abort(400, "'competition' and 'season' must be strings.")
+
+    # Imported on first use, so FAST_STARTUP workers that never ingest don't load pandas
+    import feature_store
+
+    for side in ("home", "away"):
+        stats = data.get(side)
+        if not isinstance(stats, dict) or not is_count(stats.get("goals")) or not all(is_stat(stats.get(stat)) for stat in feature_store.SIDE_STATS):
+            abort(400, f"'{side}' must hold the side's 'goals' (a non-negative integer) and optionally its {', '.join(feature_store.SIDE_STATS)} as numbers.")
+
+    competition = data.get("competition", DEFAULT_COMPETITION)
+    season = data.get("season") or feature_store.latest_season(competition)
+    if season is None:
+        abort(404, f"No match data found for {competition}.")
+    if not os.path.isdir(partition_dir(competition, season)):
+        abort(404, f"No match data found for {competition} {season}.")
+    match_rows = feature_store.result_rows(date, data["home_team"], data["away_team"], data["home"], data["away"])
+    with artifact_lock(feature_store.feature_store_file(competition, season)):
+        try:
+            store, training_rows, updated_teams = feature_store.record_results(match_rows, competition, season)
+        except FileNotFoundError:
+            abort(404, f"No match data found for {competition} {season}.")
+    if not updated_teams:
+        abort(409, "A match on or after this date is already recorded for one or both teams.")
+
+    g.state = apply_team_update([store.teams[team].team_data_row() for team in sorted(updated_teams)])
+    return jsonify({
+        "status": "recorded",
+        "updated_teams": sorted(updated_teams),
+        "training_rows": len(training_rows),
+        "version": g.state.version,
+    })
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Request and stage latency histograms, response cache counters and the served version, in the Prometheus text format."""
+    return app.response_class(metrics_registry.render(), content_type=metrics_registry.CONTENT_TYPE)
+
+@app.route("/reload", methods=["POST"])
+def reload():
+    """Starts a background reload of the model and team data."""
+    require_admin()
+    if reload_lock.locked():
+        return jsonify({"status": "already reloading", "version": current_state().version}), 202
 
-    return jsonify(response)
+    threading.Thread(target=reload_state, name="artifact-reload", daemon=True).start()
+    return jsonify({"status": "reloading", "version": current_state().version}), 202
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
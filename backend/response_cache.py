@@ -0,0 +1,50 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+class CachedResponse:
+    """A serialized JSON response body and its strong ETag."""
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+
+class ResponseCache:
+    """Thread-safe LRU cache of serialized responses.
+
+    Keys include the artifact version, so entries for old artifacts are never served.
+    clear() drops them all at once when the artifacts change.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached response for `key`, or None, marking it most recently used."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body):
+        """Cache a serialized body under `key`, evicting the least recently used entries past max_entries."""
+        entry = CachedResponse(body)
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        """Drop every entry, e.g. when the artifacts they were built from change."""
+        with self.lock:
+            self.entries.clear()
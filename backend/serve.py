@@ -0,0 +1,62 @@
+import os
+import sys
+import logging
+import subprocess
+import multiprocessing
+from gunicorn.app.base import BaseApplication
+
+# Logging Configuration
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Server settings
+BIND = os.environ.get("SERVER_BIND", "0.0.0.0:5000")
+WORKERS = int(os.environ.get("SERVER_WORKERS", multiprocessing.cpu_count()))
+THREADS = int(os.environ.get("SERVER_THREADS", 2))  # Request threads per worker
+TIMEOUT = 30
+
+class PredictorApplication(BaseApplication):
+    """Runs predictor.app under gunicorn with pre-forked workers.
+
+    Workers import the predictor after forking, in FAST_STARTUP mode, so each one maps
+    the same serving_state.bin. The team features, /teams payload, prediction matrix and
+    model trees are then shared read-only through the page cache, not copied per worker.
+    """
+
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        import predictor
+        return predictor.app
+
+def prepare_artifact():
+    """Build or refresh serving_state.bin in a separate process, so workers only have to map it."""
+    env = {**os.environ, "FAST_STARTUP": "1", "WATCH_ARTIFACTS": "0"}
+    subprocess.run([sys.executable, "-c", "import predictor; predictor.state_ready.wait()"], env=env, check=True)
+
+def main():
+    # Workers serve from the shared artifact; each still watches the source files and remaps on change
+    os.environ["FAST_STARTUP"] = "1"
+    prepare_artifact()
+
+    # Import the libraries workers use before forking, so their pages are shared copy-on-write.
+    # The predictor itself is imported per worker, since its warm-up and watcher threads don't survive a fork
+    import numpy, flask, flask_cors, inference, serving_artifact, storage  # noqa: F401
+
+    logging.info(f"Starting {WORKERS} workers x {THREADS} threads on {BIND}")
+    PredictorApplication({
+        "bind": BIND,
+        "workers": WORKERS,
+        "threads": THREADS,
+        "worker_class": "gthread" if THREADS > 1 else "sync",
+        "timeout": TIMEOUT,
+        "preload_app": False,
+    }).run()
+
+if __name__ == "__main__":
+    main()
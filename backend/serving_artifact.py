@@ -0,0 +1,84 @@
+import os
+import json
+import mmap
+import struct
+import logging
+import contextlib
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, which only matters with several workers
+    fcntl = None
+
+# File constants
+SERVING_ARTIFACT_FILE = "serving_state.bin"
+
+# Layout: magic, header length, JSON header, then each array's raw bytes at an aligned offset
+ARTIFACT_MAGIC = b"EPLSERV1"
+ARRAY_ALIGNMENT = 64
+
+def aligned(offset):
+    return -(-offset // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+
+def write_artifact(file_path, header, arrays):
+    """Write a JSON-serializable header and named NumPy arrays to one memory-mappable file.
+
+    The file is written next to its destination and renamed into place, so readers
+    (including processes that have the old file mapped) never see a partial write.
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        offset = aligned(offset)
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+
+    header_bytes = json.dumps({**header, "arrays": layout}).encode("utf-8")
+    data_start = aligned(len(ARTIFACT_MAGIC) + 8 + len(header_bytes))
+
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(ARTIFACT_MAGIC + struct.pack("<Q", len(header_bytes)) + header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, file_path)
+    logging.info(f"Serving artifact written to {file_path}")
+
+def read_artifact(file_path):
+    """Map an artifact file read-only. Returns (header, {name: array}).
+
+    The arrays are zero-copy views of the mapping. The OS shares their pages between every
+    process that maps the same file, and loads them on first touch.
+    """
+    with open(file_path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if buffer[:len(ARTIFACT_MAGIC)] != ARTIFACT_MAGIC:
+        raise ValueError(f"{file_path} is not a serving artifact")
+    header_length = struct.unpack_from("<Q", buffer, len(ARTIFACT_MAGIC))[0]
+    header_start = len(ARTIFACT_MAGIC) + 8
+    header = json.loads(buffer[header_start:header_start + header_length].decode("utf-8"))
+    data_start = aligned(header_start + header_length)
+
+    arrays = {}
+    for name, spec in header.pop("arrays").items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + spec["offset"]).reshape(spec["shape"])
+    return header, arrays
+
+@contextlib.contextmanager
+def artifact_lock(file_path):
+    """Hold an exclusive lock on the artifact across processes, so only one worker rebuilds it at a time."""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{file_path}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
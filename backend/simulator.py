@@ -0,0 +1,197 @@
+import os
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from storage import DEFAULT_COMPETITION, aggregated_file, read_table, list_partitions
+
+# Logging Configuration
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Simulation settings
+DEFAULT_SIMULATIONS = 100000
+SIMULATION_WORKERS = int(os.environ.get("SIMULATION_WORKERS", 1))
+CHUNK_SIZE = 10000  # Seasons sampled at once, bounding memory to a few (chunk x fixtures) arrays
+
+# Table places that count as winning the title, qualifying for the top four and being relegated
+TOP_SPOTS = 4
+RELEGATION_SPOTS = 3
+
+# Points for the home and away side by outcome class (away win, draw, home win), as the model orders them
+HOME_POINTS = np.array([0, 1, 3], dtype=np.float32)
+AWAY_POINTS = HOME_POINTS[::-1].copy()
+
+# Goal differences are bounded well within this, so points * TIEBREAK_SCALE + GD orders by points then GD
+TIEBREAK_SCALE = 1000
+
+class SeasonTable:
+    """The league table of one competition season so far, and the fixtures already played."""
+
+    def __init__(self, teams, points, goal_diff, played, win_margins):
+        self.teams = teams
+        self.points = np.asarray(points, dtype=np.float32)
+        self.goal_diff = np.asarray(goal_diff, dtype=np.float32)
+        self.played = played              # Set of (home team, away team)
+        self.win_margins = win_margins    # Goal margins of the season's wins, sampled for simulated wins
+
+    @classmethod
+    def from_matches(cls, matches):
+        """Build the table from aggregated match data rows (one row per team per match)."""
+        matches = matches.astype({"Team": object, "Opponent": object, "Venue": object, "Result": object})
+        teams = sorted(matches["Team"].unique())
+        by_team = matches.groupby("Team")
+        results = by_team["Result"].value_counts().unstack(fill_value=0).reindex(index=teams, columns=["W", "D"], fill_value=0)
+        points = 3 * results["W"] + results["D"]
+        goal_diff = (matches["GF"] - matches["GA"]).groupby(matches["Team"]).sum().reindex(teams, fill_value=0)
+
+        home = matches[matches["Venue"] == "Home"]
+        played = set(zip(home["Team"], home["Opponent"]))
+        wins = matches[matches["Result"] == "W"]
+        win_margins = (wins["GF"] - wins["GA"]).dropna().to_numpy(dtype=np.float32)
+        if not len(win_margins):
+            win_margins = np.ones(1, dtype=np.float32)
+        return cls(teams, points.to_numpy(), goal_diff.to_numpy(), played, win_margins)
+
+    @classmethod
+    def load(cls, competition, season):
+        return cls.from_matches(read_table(aggregated_file(competition, season), columns=["Venue", "Result", "GF", "GA", "Opponent", "Team"]))
+
+    def reset(self):
+        """The same teams and margin distribution before a ball is kicked, for simulating a whole season."""
+        zeros = np.zeros(len(self.teams), dtype=np.float32)
+        return SeasonTable(self.teams, zeros, zeros, set(), self.win_margins)
+
+    def remaining_fixtures(self):
+        """Double round robin fixtures that haven't been played yet, as (home team, away team) pairs."""
+        return [(home, away) for home in self.teams for away in self.teams if home != away and (home, away) not in self.played]
+
+def latest_season(competition):
+    """The most recent season on disk for a competition, or None."""
+    seasons = [season for _, season in list_partitions([competition])]
+    return seasons[-1] if seasons else None
+
+def fixture_probabilities(serving_state, fixtures):
+    """Score every fixture's (away win, draw, home win) probabilities with one batched model call."""
+    rows = serving_state.team_index.rows
+    unknown_teams = sorted({team for fixture in fixtures for team in fixture if team not in rows})
+    if unknown_teams:
+        raise ValueError(f"Team not found in team_data.csv: {', '.join(unknown_teams)}")
+    if not fixtures:
+        return np.empty((0, 3), dtype=np.float32)
+    home_rows, away_rows = zip(*((rows[home], rows[away]) for home, away in fixtures))
+    return np.asarray(serving_state.predict_rows(list(home_rows), list(away_rows)), dtype=np.float32)
+
+def simulate_chunk(table, home, away, probabilities, n_simulations, seed):
+    """Sample `n_simulations` seasons. Returns (finishing position counts [team, place], summed final points)."""
+    rng = np.random.default_rng(seed)
+    n_teams, n_fixtures = len(table.teams), len(home)
+
+    # Fixture x team incidence, so each team's totals are one matrix product over all sampled seasons
+    home_incidence = np.zeros((n_fixtures, n_teams), dtype=np.float32)
+    away_incidence = np.zeros((n_fixtures, n_teams), dtype=np.float32)
+    home_incidence[np.arange(n_fixtures), home] = 1
+    away_incidence[np.arange(n_fixtures), away] = 1
+
+    # Outcome class per season and fixture by inverse CDF: 0 away win, 1 draw, 2 home win
+    thresholds = np.cumsum(probabilities, axis=1)
+    draws = rng.random((n_simulations, n_fixtures), dtype=np.float32)
+    outcomes = (draws >= thresholds[:, 0]).astype(np.int8) + (draws >= thresholds[:, 1])
+
+    points = table.points + HOME_POINTS[outcomes] @ home_incidence + AWAY_POINTS[outcomes] @ away_incidence
+
+    # Winning margins drawn from the season's real ones; draws change nobody's goal difference
+    margins = rng.choice(table.win_margins, size=(n_simulations, n_fixtures))
+    home_margins = np.where(outcomes == 2, margins, np.where(outcomes == 0, -margins, 0)).astype(np.float32)
+    goal_diff = table.goal_diff + home_margins @ (home_incidence - away_incidence)
+
+    # Rank by points, then goal difference, then at random
+    keys = points.astype(np.float64) * TIEBREAK_SCALE + goal_diff + rng.random((n_simulations, n_teams))
+    standings = np.argsort(-keys, axis=1)  # Team index at each place
+    position_counts = np.stack([np.bincount(standings[:, place], minlength=n_teams) for place in range(n_teams)], axis=1)
+    return position_counts, points.sum(axis=0, dtype=np.float64)
+
+def simulate(table, fixtures, probabilities, n_simulations, seed=None, workers=1):
+    """Simulate the rest of the season `n_simulations` times, in chunks spread over `workers` processes.
+
+    Returns (probability of each team finishing in each place [team, place], expected final points).
+    """
+    team_ids = {team: i for i, team in enumerate(table.teams)}
+    unknown_teams = sorted({team for fixture in fixtures for team in fixture if team not in team_ids})
+    if unknown_teams:
+        raise ValueError(f"Team not in this season's table: {', '.join(unknown_teams)}")
+    home = np.array([team_ids[home] for home, _ in fixtures], dtype=np.intp)
+    away = np.array([team_ids[away] for _, away in fixtures], dtype=np.intp)
+
+    chunk_sizes = [CHUNK_SIZE] * (n_simulations // CHUNK_SIZE) + ([n_simulations % CHUNK_SIZE] if n_simulations % CHUNK_SIZE else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    chunk_args = [(table, home, away, probabilities, size, chunk_seed) for size, chunk_seed in zip(chunk_sizes, seeds)]
+
+    if workers > 1 and len(chunk_args) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunk_args))) as executor:
+            chunk_results = list(executor.map(simulate_chunk, *zip(*chunk_args)))
+    else:
+        chunk_results = [simulate_chunk(*args) for args in chunk_args]
+
+    position_counts = sum(counts for counts, _ in chunk_results)
+    points_sum = sum(points for _, points in chunk_results)
+    return position_counts / n_simulations, points_sum / n_simulations
+
+def summarize(table, positions, expected_points):
+    """One row per team, ordered by expected finishing place."""
+    places = np.arange(1, len(table.teams) + 1)
+    summary = []
+    for i in np.argsort(positions @ places):
+        summary.append({
+            "team": table.teams[i],
+            "points": int(table.points[i]),
+            "expected_points": round(float(expected_points[i]), 2),
+            "title": round(float(positions[i, 0]) * 100, 2),
+            "top_four": round(float(positions[i, :TOP_SPOTS].sum()) * 100, 2),
+            "relegation": round(float(positions[i, -RELEGATION_SPOTS:].sum()) * 100, 2),
+            "positions": [round(float(share) * 100, 2) for share in positions[i]],
+        })
+    return summary
+
+def simulate_season(serving_state, table, fixtures, n_simulations, seed=None, workers=1):
+    """Score `fixtures` with the serving model and simulate them. Returns the per-team summary."""
+    probabilities = fixture_probabilities(serving_state, fixtures)
+    positions, expected_points = simulate(table, fixtures, probabilities, n_simulations, seed, workers)
+    return summarize(table, positions, expected_points)
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the rest of a season and estimate title, top-four and relegation chances.")
+    parser.add_argument("--competition", default=DEFAULT_COMPETITION)
+    parser.add_argument("--season", help="Season to simulate, e.g. 2024-2025 (default: latest on disk)")
+    parser.add_argument("--simulations", type=int, default=DEFAULT_SIMULATIONS)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--workers", type=int, default=SIMULATION_WORKERS, help="Processes to spread simulations over")
+    parser.add_argument("--full-season", action="store_true", help="Simulate every fixture, ignoring results so far")
+    args = parser.parse_args()
+
+    season = args.season or latest_season(args.competition)
+    if season is None:
+        logging.error(f"No data partitions found for {args.competition}.")
+        return
+
+    # The predictor loads the serving model and team features on import, or in the background with FAST_STARTUP
+    os.environ.setdefault("WATCH_ARTIFACTS", "0")
+    import predictor
+    predictor.state_ready.wait()
+    if predictor.state is None:
+        logging.error("The model and team data could not be loaded.")
+        return
+
+    table = SeasonTable.load(args.competition, season)
+    if args.full_season:
+        table = table.reset()
+    fixtures = table.remaining_fixtures()
+    logging.info(f"Simulating {len(fixtures)} fixtures of {args.competition} {season} {args.simulations} times...")
+    summary = simulate_season(predictor.state, table, fixtures, args.simulations, args.seed, args.workers)
+
+    print(f"{'':<4}{'Team':<26}{'Pts':>5}{'xPts':>8}{'Title %':>9}{'Top 4 %':>9}{'Releg %':>9}")
+    for place, row in enumerate(summary, start=1):
+        print(f"{place:<4}{row['team']:<26}{row['points']:>5}{row['expected_points']:>8.1f}"
+              f"{row['title']:>9.1f}{row['top_four']:>9.1f}{row['relegation']:>9.1f}")
+
+if __name__ == "__main__":
+    main()
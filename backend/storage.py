@@ -0,0 +1,170 @@
+import os
+import re
+import sys
+import logging
+import datetime
+
+# pandas is imported by the functions that need it, so the path helpers stay cheap to import
+# for the prediction server, which imports this module before it can serve anything
+
+# Logging Configuration
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Format used for pipeline tables: 'csv', or the typed columnar 'parquet' / 'feather' (both need pyarrow)
+DATA_FORMAT = os.environ.get("DATA_FORMAT", "csv").lower()
+EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+
+# Match data is partitioned by competition and season: Data/<competition>/<season>/
+DATA_DIR = "Data"
+DEFAULT_COMPETITION = "Premier League"
+TEAM_MATCH_DATA_FOLDER = "Team Match Data"
+SEASON_PATTERN = re.compile(r"^\d{4}-\d{4}$")
+
+# Columns stored with native types in columnar formats
+DATETIME_COLS = ["Date"]
+CATEGORICAL_COLS = ["Team", "Opponent", "Venue", "Result", "Logo", "Team_Name", "Home_Team", "Away_Team"]
+
+if DATA_FORMAT not in EXTENSIONS:
+    raise ValueError(f"Unknown DATA_FORMAT '{DATA_FORMAT}'. Choose one of: {', '.join(EXTENSIONS)}")
+
+def table_path(base_path, data_format=DATA_FORMAT):
+    """Return the file path for a table stored in `data_format`, given its path without extension."""
+    return f"{base_path}{EXTENSIONS[data_format]}"
+
+def table_format(file_path):
+    """Infer a table's storage format from its file extension."""
+    for data_format, extension in EXTENSIONS.items():
+        if file_path.endswith(extension):
+            return data_format
+    raise ValueError(f"Unsupported table file: {file_path}")
+
+def current_season(today=None):
+    """Label of the season in progress on `today` (e.g. '2024-2025'). Seasons are taken to start in July."""
+    today = today or datetime.date.today()
+    start_year = today.year if today.month >= 7 else today.year - 1
+    return f"{start_year}-{start_year + 1}"
+
+def partition_dir(competition, season):
+    """Folder holding one competition season's match and training data."""
+    return os.path.join(DATA_DIR, competition, season)
+
+def team_match_data_dir(competition, season):
+    """Folder holding one competition season's per-team match data."""
+    return os.path.join(partition_dir(competition, season), TEAM_MATCH_DATA_FOLDER)
+
+def aggregated_file(competition, season):
+    """Path of one competition season's aggregated match data table."""
+    return table_path(os.path.join(partition_dir(competition, season), "agg_match_data"))
+
+def training_data_file(competition, season):
+    """Path of one competition season's training data table."""
+    return table_path(os.path.join(partition_dir(competition, season), "training_data"))
+
+def list_partitions(competitions=None, seasons=None):
+    """List (competition, season) partitions on disk in competition then season order, optionally filtered."""
+    partitions = []
+    if not os.path.isdir(DATA_DIR):
+        return partitions
+
+    for competition in sorted(os.listdir(DATA_DIR)):
+        competition_dir = os.path.join(DATA_DIR, competition)
+        if not os.path.isdir(competition_dir) or (competitions and competition not in competitions):
+            continue
+        for season in sorted(os.listdir(competition_dir)):
+            if SEASON_PATTERN.match(season) and (not seasons or season in seasons):
+                partitions.append((competition, season))
+    return partitions
+
+def apply_schema(data):
+    """Convert dates to datetimes and labels/team names to categoricals."""
+    import pandas as pd
+    data = data.copy()
+    for col in DATETIME_COLS:
+        if col in data.columns:
+            data[col] = pd.to_datetime(data[col], errors="coerce")
+    for col in CATEGORICAL_COLS:
+        if col in data.columns:
+            data[col] = data[col].astype("category")
+    return data
+
+def read_table(file_path, columns=None, index_col=None):
+    """Read a table, loading only `columns` (plus `index_col`) when given.
+
+    CSV files are read as plain text columns; Parquet and Feather keep the native
+    datetime and categorical types they were written with.
+    """
+    import pandas as pd
+    if columns is not None and index_col is not None and index_col not in columns:
+        columns = [index_col] + list(columns)
+
+    data_format = table_format(file_path)
+    if data_format == "csv":
+        data = pd.read_csv(file_path, usecols=columns, index_col=index_col)
+    else:
+        if data_format == "parquet":
+            data = pd.read_parquet(file_path, columns=columns)
+        else:
+            data = pd.read_feather(file_path, columns=columns)
+        if index_col is not None:
+            data = data.set_index(index_col)
+
+    # Return columns in the order they were asked for, not the order they are stored in
+    if columns is not None:
+        data = data[[col for col in columns if col != index_col]]
+    return data
+
+def write_table(data, file_path, index=False):
+    """Write a table in the format implied by its extension. A named index is kept as a column when `index` is set."""
+    data_format = table_format(file_path)
+    if data_format == "csv":
+        data.to_csv(file_path, index=index)
+        return
+
+    data = apply_schema(data.reset_index() if index else data.reset_index(drop=True))
+    if data_format == "parquet":
+        data.to_parquet(file_path, index=False)
+    else:
+        data.to_feather(file_path)
+
+def append_table(data, file_path, index=False):
+    """Append rows to a table, creating it if needed. CSV files are appended to in place; columnar formats are rewritten."""
+    import pandas as pd
+    if not os.path.exists(file_path):
+        write_table(data, file_path, index=index)
+        return
+
+    if table_format(file_path) == "csv":
+        header = pd.read_csv(file_path, index_col=0 if index else None, nrows=0).columns
+        data.reindex(columns=header).to_csv(file_path, mode="a", header=False, index=index)
+        return
+
+    existing = read_table(file_path, index_col=data.index.name if index else None)
+    write_table(pd.concat([existing, data], ignore_index=not index), file_path, index=index)
+
+def list_tables(data_dir, data_format=DATA_FORMAT):
+    """List the table files in `data_dir` stored in `data_format`."""
+    extension = EXTENSIONS[data_format]
+    return sorted(os.path.join(data_dir, name) for name in os.listdir(data_dir) if name.endswith(extension))
+
+def convert_tables(data_dir, source_format, target_format):
+    """Convert every `source_format` table under `data_dir` (recursively) into `target_format`."""
+    for root, _, _ in os.walk(data_dir):
+        for file_path in list_tables(root, source_format):
+            target_path = table_path(file_path[:-len(EXTENSIONS[source_format])], target_format)
+            data = read_table(file_path)
+
+            # Keep the aggregated file's ID column as its index
+            has_id = "ID" in data.columns
+            write_table(data.set_index("ID") if has_id else data, target_path, index=has_id)
+            logging.info(f"Converted {file_path} to {target_path}")
+
+def main():
+    """Convert the Data folder between formats, e.g. `python storage.py csv parquet`."""
+    if len(sys.argv) != 3 or any(arg not in EXTENSIONS for arg in sys.argv[1:]):
+        print(f"Usage: python storage.py <source format> <target format>, where formats are: {', '.join(EXTENSIONS)}")
+        return
+
+    convert_tables(DATA_DIR, sys.argv[1], sys.argv[2])
+
+if __name__ == "__main__":
+    main()
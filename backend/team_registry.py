@@ -0,0 +1,52 @@
+import os
+import json
+import logging
+from storage import DATA_DIR
+
+# File constants
+TEAM_REGISTRY_FILE = os.path.join(DATA_DIR, "team_registry.json")
+
+class TeamRegistry:
+    """Persistent mapping of team names to integer codes.
+
+    Codes are assigned once and never changed or reused, so a team keeps the same code
+    across seasons and competitions, and after promotion or relegation. Teams seen
+    together for the first time get codes in alphabetical order, so a registry seeded
+    from a single season matches the codes `cat.codes` used to give.
+    """
+
+    def __init__(self, codes=None):
+        self.codes = dict(codes or {})
+
+    @classmethod
+    def load(cls, file_path=TEAM_REGISTRY_FILE):
+        """Load the registry, or start an empty one if it doesn't exist yet."""
+        if not os.path.exists(file_path):
+            return cls()
+        with open(file_path, encoding="utf-8") as f:
+            return cls(json.load(f)["teams"])
+
+    def save(self, file_path=TEAM_REGISTRY_FILE):
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"teams": self.codes}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, file_path)
+
+    def register(self, teams):
+        """Assign codes to any of `teams` not yet registered, in alphabetical order."""
+        next_code = max(self.codes.values(), default=-1) + 1
+        for team in sorted(set(teams) - set(self.codes)):
+            self.codes[team] = next_code
+            logging.info(f"Registered {team} as team {next_code}")
+            next_code += 1
+
+    def code(self, team):
+        """Return a team's code, registering it first if needed."""
+        self.register([team])
+        return self.codes[team]
+
+    def codes_for(self, teams):
+        """Map a Series of team names to their codes, registering new teams first."""
+        teams = teams.astype(object)
+        self.register(teams.dropna().unique())
+        return teams.map(self.codes)
@@ -3,24 +3,67 @@ import io
 import time
 import random
 import logging
+import threading
+import unicodedata
 import requests
 import pandas as pd
+from urllib.parse import urlparse
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+import lxml.html
 from bs4 import BeautifulSoup
 from fuzzywuzzy import process
+from page_cache import PageCache, CachedPage
+from storage import (
+    DEFAULT_COMPETITION, table_path, read_table, write_table, append_table, list_tables, current_season,
+    team_match_data_dir, aggregated_file
+)
 
 # Logging Configuration
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 # URL Constants
 BASE_URL = "https://fbref.com"
-STANDINGS_URL = f"{BASE_URL}/en/comps/9/Premier-League-Stats"
 TEAM_URL_PART = "/squads/"
 SHOOTING_URL_PART = "all_comps/shooting/"
 
-# File constants
+# Supported competitions, by the name fbref uses in match logs: (fbref competition ID, URL slug)
+COMPETITIONS = {
+    "Premier League": (9, "Premier-League"),
+    "La Liga": (12, "La-Liga"),
+    "Serie A": (11, "Serie-A"),
+    "Bundesliga": (20, "Bundesliga"),
+    "Ligue 1": (13, "Ligue-1"),
+}
+
+# Competition and season to scrape, e.g. SCRAPER_SEASON=2023-2024 for a past season
+COMPETITION = os.environ.get("SCRAPER_COMPETITION", DEFAULT_COMPETITION)
+SEASON = os.environ.get("SCRAPER_SEASON") or current_season()
+
+if COMPETITION not in COMPETITIONS:
+    raise ValueError(f"Unknown SCRAPER_COMPETITION '{COMPETITION}'. Choose one of: {', '.join(COMPETITIONS)}")
+
+# File constants; scraped data goes to the Data/<competition>/<season>/ partition
 DATA_DIR = "Data"
-TEAM_MATCH_DATA_DIR = os.path.join(DATA_DIR, "Team Match Data")
-AGGREGATED_FILE = os.path.join(DATA_DIR, "agg_match_data.csv")
+TEAM_MATCH_DATA_DIR = team_match_data_dir(COMPETITION, SEASON)
+AGGREGATED_FILE = aggregated_file(COMPETITION, SEASON)
+
+# Columns identifying a single match from one team's perspective
+MATCH_KEY_COLS = ["Team", "Date", "Opponent"]
+
+# Scraping limits: requests per minute allowed against each host, and teams scraped at once
+REQUESTS_PER_MINUTE = float(os.environ.get("SCRAPER_REQUESTS_PER_MINUTE", 10))
+MAX_WORKERS = int(os.environ.get("SCRAPER_MAX_WORKERS", 4))
+
+# Longest Retry-After we are willing to wait out on a 429 response, in seconds
+MAX_RETRY_AFTER = 300
+
+# Page cache: 'on' revalidates cached pages, 'replay' serves only cached pages (offline), 'off' disables it
+PAGE_CACHE_MODE = os.environ.get("SCRAPER_CACHE_MODE", "on").lower()
+PAGE_CACHE_DIR = os.path.join(DATA_DIR, "Page Cache")
+PAGE_CACHE_TTL = float(os.environ.get("SCRAPER_CACHE_TTL", 6 * 60 * 60))  # Seconds before a page is revalidated
+PAGE_CACHE_MAX_BYTES = 200 * 1024 * 1024
 
 # List of User-Agents to rotate
 USER_AGENTS = [
@@ -29,19 +72,102 @@ USER_AGENTS = [
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
 ]
 
-class MissingDict(dict):
-    __missing__ = lambda self, key: key
-
+# Short names used for opponents in match logs, per competition, mapped to the names taken from team page URLs.
+# Accents and hyphens are handled by normalize_team_name, so only abbreviations need listing
 MAPPED_TEAM_NAMES = {
-    "Brighton": "Brighton and Hove Albion",
-    "Manchester Utd": "Manchester United",
-    "Nott'ham Forest": "Nottingham Forest",
-    "Newcastle Utd": "Newcastle United",
-    "Tottenham": "Tottenham Hotspur",
-    "West Ham": "West Ham United",
-    "Wolves": "Wolverhampton Wanderers"
+    "Premier League": {
+        "Brighton": "Brighton and Hove Albion",
+        "Manchester Utd": "Manchester United",
+        "Nott'ham Forest": "Nottingham Forest",
+        "Newcastle Utd": "Newcastle United",
+        "Tottenham": "Tottenham Hotspur",
+        "West Ham": "West Ham United",
+        "Wolves": "Wolverhampton Wanderers",
+        "Sheffield Utd": "Sheffield United",
+        "West Brom": "West Bromwich Albion",
+    },
+    "La Liga": {
+        "Betis": "Real Betis",
+    },
+    "Serie A": {
+        "Inter": "Internazionale",
+    },
+    "Bundesliga": {
+        "Leverkusen": "Bayer Leverkusen",
+        "Gladbach": "Monchengladbach",
+        "M'Gladbach": "Monchengladbach",
+        "Eint Frankfurt": "Eintracht Frankfurt",
+        "St. Pauli": "St Pauli",
+    },
+    "Ligue 1": {
+        "Paris S-G": "Paris Saint Germain",
+    },
 }
 
+class RateLimiter:
+    """Thread-safe token bucket allowing `requests_per_minute` requests, with bursts of up to `burst`."""
+
+    def __init__(self, requests_per_minute, burst=1):
+        self.interval = 60.0 / requests_per_minute
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+                self.updated = now
+
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) * self.interval)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Stop handing out tokens for `seconds`, e.g. when the host asks us to back off."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+rate_limiters = {}
+rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(url):
+    """Return the shared rate limiter for the host serving `url`."""
+    host = urlparse(url).netloc
+    with rate_limiters_lock:
+        if host not in rate_limiters:
+            rate_limiters[host] = RateLimiter(REQUESTS_PER_MINUTE)
+        return rate_limiters[host]
+
+def parse_retry_after(value):
+    """Convert a Retry-After header (seconds or HTTP date) into seconds to wait, or None."""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0), MAX_RETRY_AFTER)
+
+def create_session(max_workers=MAX_WORKERS):
+    """Create a session whose connection pool can serve every worker thread."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(get_headers())
+    return session
+
 def get_headers(user_agent=None):
     """Generate headers, optionally keeping the same User-Agent."""
     if user_agent is None:
@@ -56,36 +182,82 @@ def get_headers(user_agent=None):
         "Connection": "keep-alive",
     }
 
-def make_request(session, url, retries=3):
-    """Send a request with consistent User-Agent but header rotation, with retries for 429 or other transient errors."""
-    user_agent = session.headers.get('User-Agent')
-    session.headers.update(get_headers(user_agent))
-    
+def make_request(session, url, retries=3, extra_headers=None):
+    """Send a rate-limited request with consistent User-Agent but header rotation, with retries for 429 or other transient errors."""
+    headers = get_headers(session.headers.get('User-Agent'))
+    headers.update(extra_headers or {})
+    rate_limiter = get_rate_limiter(url)
+
     for attempt in range(retries):
+        rate_limiter.acquire()
+        start = time.perf_counter()
+        try:
+            response = session.get(url, headers=headers, timeout=10)
+        except requests.RequestException as e:
+            logging.error(f"Request failed for {url}: {e}")
+            return None
+        logging.info(f"GET {url} -> {response.status_code} in {time.perf_counter() - start:.2f}s")
+
+        # Check for 429 rate limit error, backing off every worker using this host
+        if response.status_code == 429:
+            wait = parse_retry_after(response.headers.get("Retry-After"))
+            if wait is None:
+                wait = 2**attempt  # Exponential backoff
+            logging.warning(f"Rate limit hit for {url}. Pausing requests to this host for {wait:.0f} seconds...")
+            rate_limiter.pause(wait)
+            continue  # Retry once the pause has passed
+
+        # Retry on server-side errors (5xx)
+        if 500 <= response.status_code < 600:
+            logging.warning(f"Server error for {url}. Retrying in {2**attempt} seconds...")
+            time.sleep(2**attempt)
+            continue
+
         try:
-            response = session.get(url, timeout=10)
-            
-            # Check for 429 rate limit error
-            if response.status_code == 429:
-                logging.warning(f"Rate limit hit for {url}. Sleeping for {2**attempt} seconds...")
-                time.sleep(2**attempt)  # Exponential backoff
-                continue  # Retry after sleeping
-            
-            # Retry on server-side errors (5xx)
-            if 500 <= response.status_code < 600:
-                logging.warning(f"Server error for {url}. Retrying in {2**attempt} seconds...")
-                time.sleep(2**attempt)
-                continue
-            
             response.raise_for_status()  # Raise an error for other bad status codes (4xx)
-            return response
         except requests.RequestException as e:
             logging.error(f"Request failed for {url}: {e}")
             return None
-    
+        return response
+
     logging.error(f"Exceeded max retries for {url}. Skipping...")
     return None
 
+def create_page_cache(mode=PAGE_CACHE_MODE):
+    """Create the page cache for the configured mode, or None when caching is off."""
+    if mode == "off":
+        return None
+    return PageCache(PAGE_CACHE_DIR, PAGE_CACHE_TTL, PAGE_CACHE_MAX_BYTES, replay=(mode == "replay"))
+
+def fetch_page(session, url, cache=None):
+    """Fetch a page, revalidating any cached copy with a conditional request. Returns a CachedPage or None."""
+    if cache is None:
+        response = make_request(session, url)
+        return CachedPage(url, response.text, changed=True, from_cache=False) if response is not None else None
+
+    meta = cache.get_meta(url)
+    if cache.replay:
+        if meta is None:
+            logging.error(f"{url} is not in the page cache and replay mode is on.")
+            return None
+        return cache.read(url, meta, changed=True)
+
+    if meta is not None and cache.is_fresh(meta):
+        logging.info(f"Using cached copy of {url}")
+        return cache.read(url, meta)
+
+    response = make_request(session, url, extra_headers=cache.conditional_headers(meta) if meta else None)
+    if response is None:
+        return None
+    if response.status_code == 304:
+        return cache.read(url, meta, revalidated=True)
+    return cache.store(url, response, meta)
+
+def standings_url(competition, season):
+    """URL of a competition's standings page for a season, e.g. '2024-2025'."""
+    competition_id, slug = COMPETITIONS[competition]
+    return f"{BASE_URL}/en/comps/{competition_id}/{season}/{season}-{slug}-Stats"
+
 def check_data(data, error_message):
     """Helper function to check if data is valid."""
     if not data:
@@ -93,6 +265,74 @@ def check_data(data, error_message):
         return False
     return True
     
+def team_name_from_url(team_url):
+    """Extract a clean team name from a team stats page URL."""
+    return team_url.split("/")[-1].replace("-Stats", "").replace("-", " ")
+
+def normalize_team_name(name):
+    """Spell a match log name the way team_name_from_url does: no accents, spaces for hyphens."""
+    name = unicodedata.normalize("NFKD", name)
+    return "".join(char for char in name if not unicodedata.combining(char)).replace("-", " ")
+
+def resolve_opponent(name, competition=COMPETITION):
+    """Map a match log opponent to its team name, e.g. Wolves -> Wolverhampton Wanderers, Atlético Madrid -> Atletico Madrid."""
+    return normalize_team_name(MAPPED_TEAM_NAMES.get(competition, {}).get(name, name))
+
+def unresolved_opponents(match_data, team_names):
+    """Opponents in scraped match data that match no team in the standings; their fixtures would be dropped from training."""
+    if match_data.empty:
+        return []
+    return sorted(set(match_data["Opponent"].dropna()) - set(team_names))
+
+def get_matches_played(standings_table):
+    """Map each team in the standings table to its number of matches played."""
+    matches_played = {}
+    for row in standings_table.select("tbody tr"):
+        team_link = row.find("a", href=lambda href: href and TEAM_URL_PART in href)
+        games = row.find("td", {"data-stat": "games"})
+        if team_link and games and games.text.strip().isdigit():
+            matches_played[team_name_from_url(team_link["href"])] = int(games.text)
+    return matches_played
+
+def read_html_table(table):
+    """Parse a single lxml <table> element into a DataFrame."""
+    return pd.read_html(io.StringIO(lxml.html.tostring(table, encoding="unicode")), flavor="lxml")[0]
+
+def table_matches(table, match):
+    """Whether a table's caption (or, without a caption, its text) contains `match`."""
+    caption = table.find("caption")
+    text = caption.text_content() if caption is not None else table.text_content()
+    return match in text
+
+def parse_team_page(html):
+    """Walk a team page once, returning (fixtures table, logo URL, shooting link).
+
+    Missing pieces are returned as None, or "" for the logo.
+    """
+    fixtures_table, team_logo_url, shooting_link = None, "", None
+
+    for element in lxml.html.fromstring(html).iter("table", "img", "a"):
+        if element.tag == "table":
+            if fixtures_table is None and table_matches(element, "Scores & Fixtures"):
+                fixtures_table = element
+        elif element.tag == "img":
+            if not team_logo_url and "teamlogo" in element.get("class", "").split():
+                team_logo_url = element.get("src", "")
+        elif shooting_link is None and SHOOTING_URL_PART in element.get("href", ""):
+            shooting_link = element.get("href")
+
+    match_dataframe = read_html_table(fixtures_table) if fixtures_table is not None else None
+    return match_dataframe, team_logo_url, shooting_link
+
+def parse_shooting_page(html):
+    """Parse only the shooting stats table from a team's shooting page, or return None if it is missing."""
+    for table in lxml.html.fromstring(html).iter("table"):
+        if table_matches(table, "Shooting"):
+            shooting_dataframe = read_html_table(table)
+            shooting_dataframe.columns = shooting_dataframe.columns.droplevel()
+            return shooting_dataframe
+    return None
+
 def process_team_input(team_input, team_names):
     """Matches user input to valid team names using fuzzy matching."""
     selected_teams = [team.strip().lower() for team in team_input.split(",")]
@@ -111,42 +351,48 @@ def process_team_input(team_input, team_names):
 
     return matched_teams if matched_teams else None
 
-def scrape_team_data(team_url, team_name, session):
-    """Scrapes team match data."""
+def scrape_team_data(team_url, team_name, session, cache=None):
+    """Scrapes team match data. Returns None if neither of the team's pages changed since the last scrape."""
     logging.info(f"Scraping data for {team_name}...")
 
     # Get team match data
-    team_data_page = make_request(session, team_url)
+    team_data_page = fetch_page(session, team_url, cache)
     if not check_data(team_data_page, f"Request failed for {team_name}."):
         return pd.DataFrame()
 
-    match_dfs = pd.read_html(io.StringIO(team_data_page.text), match="Scores & Fixtures")
-    if not check_data(match_dfs, f"No match data found for {team_name}, skipping..."):
+    # When the team page is unchanged, check the shooting page found on it last time before parsing anything
+    shooting_page = None
+    if cache is not None and not team_data_page.changed and os.path.exists(team_output_file(team_name)):
+        shooting_url = cache.get_extra(team_url, "shooting_url")
+        if shooting_url:
+            shooting_page = fetch_page(session, shooting_url, cache)
+            if shooting_page is not None and not shooting_page.changed:
+                logging.info(f"No changes for {team_name} since the last scrape, skipping...")
+                return None
+
+    # Parse the fixtures table, logo and shooting link in a single pass over the page
+    match_dataframe, team_logo_url, shooting_link = parse_team_page(team_data_page.text)
+    if not check_data(match_dataframe is not None, f"No match data found for {team_name}, skipping..."):
         return pd.DataFrame()
 
-    match_dataframe = match_dfs[0]
-    soup = BeautifulSoup(team_data_page.text, "html.parser")
-
-    # Get the team logo URL from the team page
-    image_tag = soup.find("img", class_="teamlogo")
-    team_logo_url = image_tag["src"] if image_tag else ""
-
     # Get shooting data from the team page
-    team_data_links = [l.get("href") for l in soup.find_all('a')]
-    shooting_links = [l for l in team_data_links if l and SHOOTING_URL_PART in l]
-    if not check_data(shooting_links, f"No shooting data found for {team_name}. Skipping shooting stats..."):
+    if not check_data(shooting_link, f"No shooting data found for {team_name}. Skipping shooting stats..."):
         return pd.DataFrame()
 
-    shooting_data = make_request(session, f"{BASE_URL}{shooting_links[0]}")
+    shooting_url = f"{BASE_URL}{shooting_link}"
+    if cache is not None:
+        cache.set_extra(team_url, "shooting_url", shooting_url)
+
+    # Reuse the shooting page if it was already fetched above
+    shooting_data = shooting_page
+    if shooting_data is None or shooting_data.url != shooting_url:
+        shooting_data = fetch_page(session, shooting_url, cache)
     if not check_data(shooting_data, f"Request failed for {team_name}."):
         return pd.DataFrame()
-    
-    shooting_dfs = pd.read_html(io.StringIO(shooting_data.text), match="Shooting")
-    if not check_data(shooting_dfs, f"Could not find shooting data for {team_name}, skipping..."):
-        return pd.DataFrame()
 
-    shooting_dataframe = shooting_dfs[0]
-    shooting_dataframe.columns = shooting_dataframe.columns.droplevel()
+    shooting_dataframe = parse_shooting_page(shooting_data.text)
+    if not check_data(shooting_dataframe is not None, f"Could not find shooting data for {team_name}, skipping..."):
+        return pd.DataFrame()
 
     try:
         team_data = match_dataframe.merge(shooting_dataframe[["Date", "Sh", "SoT", "FK", "PKatt"]], on="Date")
@@ -154,15 +400,15 @@ def scrape_team_data(team_url, team_name, session):
         logging.error(f"Error merging data for {team_name}. Skipping...")
         return pd.DataFrame()
     
-    # Filter to Premier League matches
-    team_data = team_data[team_data["Comp"] == "Premier League"]
+    # Filter to matches in the competition being scraped
+    team_data = team_data[team_data["Comp"] == COMPETITION]
 
     # Add team name and logo url columns
     team_data["Team"] = team_name
     team_data["Logo"] = team_logo_url
 
-    # Map opponent team names to the full team name (Wolves -> Wolverhamptoon Wanderers)
-    team_data["Opponent"] = team_data["Opponent"].apply(lambda x: MissingDict(**MAPPED_TEAM_NAMES)[x])
+    # Map opponent team names to the full team name (Wolves -> Wolverhampton Wanderers)
+    team_data["Opponent"] = team_data["Opponent"].map(resolve_opponent)
 
     # Drop unnecessary columns
     team_data.drop(columns=[
@@ -171,101 +417,229 @@ def scrape_team_data(team_url, team_name, session):
 
     return team_data
 
-def aggregate_data(data_dir, output_file):
-    """Aggregates all team CSV files into one dataset."""
+def aggregate_data(data_dir, output_file, max_workers=MAX_WORKERS):
+    """Aggregates all team match data files into one dataset, reading the files in parallel."""
     logging.info("Aggregating data...")
-    all_team_data = []
 
-    # Loop through all CSV files in the Team Data folder
-    for file_name in os.listdir(data_dir):
-        if file_name.endswith(".csv"):
-            team_data_path = os.path.join(data_dir, file_name)
-            logging.info(f"Reading data from {team_data_path}...")
-            team_data = pd.read_csv(team_data_path)
-            all_team_data.append(team_data)
+    def read_team_data(team_data_path):
+        logging.info(f"Reading data from {team_data_path}...")
+        return read_table(team_data_path)
+
+    # Read every team file in the Team Data folder, keeping their listed order
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        all_team_data = list(executor.map(read_team_data, list_tables(data_dir)))
 
-    # Concatenate all team data into one DataFrame and save as single csv file
+    # Concatenate all team data into one DataFrame and save as a single file
     if all_team_data:
         final_data = pd.concat(all_team_data, ignore_index=True)
         final_data.index.name = "ID"
-        final_data.to_csv(output_file)
+        write_table(final_data, output_file, index=True)
         logging.info(f"Aggregated data saved to {output_file}")
     else:
         logging.error("No data to aggregate.")
 
-def main():
-    # Ask user if they want to scrape, aggregate, or both
-    action = input("Enter 'scrape' to scrape new data, 'aggregate' to aggregate existing data, or 'both' for both: ").strip().lower()
-    do_scrape = action in ('scrape', 'both')
-    do_aggregate = action in ('aggregate', 'both')
-
-    # Ensure folders exists for output
-    os.makedirs(DATA_DIR, exist_ok=True)
-    os.makedirs(TEAM_MATCH_DATA_DIR, exist_ok=True)
-
-    if do_scrape:
-        # Create a session
-        session = requests.Session()
-        session.headers.update(get_headers())
-
-        # Get the HTML from the standings page
-        standings_page = make_request(session, STANDINGS_URL)
-        if not check_data(standings_page, "Request failed. Check the URL or retry after some time in case of temporary IP blocking. Exiting..."):
-            exit()
+def team_output_file(team_name):
+    """Path of the file holding a team's match data."""
+    return table_path(os.path.join(TEAM_MATCH_DATA_DIR, f"{team_name.replace(' ', '_')}_match_data"))
+
+def load_team_match_data(team_name):
+    """Load a team's stored match data, or None if it hasn't been scraped yet."""
+    team_data_path = team_output_file(team_name)
+    return read_table(team_data_path) if os.path.exists(team_data_path) else None
+
+def teams_with_new_matches(team_urls, team_names, matches_played):
+    """Filter to teams whose matches played in the standings exceed the matches stored for them."""
+    selected_urls, selected_names = [], []
+    for team_url, team_name in zip(team_urls, team_names):
+        stored = load_team_match_data(team_name)
+        if stored is not None and team_name in matches_played and len(stored) >= matches_played[team_name]:
+            logging.info(f"No new matches for {team_name} since {stored['Date'].max()}, skipping...")
+            continue
+        selected_urls.append(team_url)
+        selected_names.append(team_name)
+    return selected_urls, selected_names
+
+def merge_new_matches(stored, scraped):
+    """Append scraped matches played after the latest stored Date. Returns (combined data, new rows)."""
+    if stored is None or stored.empty:
+        return scraped, scraped
+
+    # Compare dates as datetimes whether they were stored as text or natively
+    stored = stored.assign(Date=pd.to_datetime(stored["Date"]))
+    scraped = scraped.assign(Date=pd.to_datetime(scraped["Date"]))
+
+    new_rows = scraped[scraped["Date"] > stored["Date"].max()]
+    combined = pd.concat([stored, new_rows], ignore_index=True).drop_duplicates(subset=MATCH_KEY_COLS)
+    return combined, combined.iloc[len(stored):]
+
+def append_to_aggregate(new_rows, output_file):
+    """Append new match rows to the aggregated file in place, skipping matches it already holds."""
+    if new_rows.empty:
+        logging.info("No new matches to aggregate.")
+        return
+    if not os.path.exists(output_file):
+        aggregate_data(TEAM_MATCH_DATA_DIR, output_file)
+        return
+
+    # Only the ID and key columns are needed to dedupe and continue the ID sequence
+    existing = read_table(output_file, columns=MATCH_KEY_COLS, index_col="ID")
+    existing_keys = set(existing.astype(str).itertuples(index=False, name=None))
+    new_rows = new_rows.assign(Date=pd.to_datetime(new_rows["Date"]).dt.strftime("%Y-%m-%d"))
+    is_new = [key not in existing_keys for key in new_rows[MATCH_KEY_COLS].astype(str).itertuples(index=False, name=None)]
+
+    next_id = existing.index.max() + 1
+    rows = new_rows[is_new].copy()
+    rows.index = pd.RangeIndex(next_id, next_id + len(rows), name="ID")
+
+    append_table(rows, output_file, index=True)
+    logging.info(f"Appended {len(rows)} new matches to {output_file}")
+
+def save_team_data(team_data, team_name):
+    """Save a team's match data to its file, overwriting if the file already exists."""
+    output_file = team_output_file(team_name)
+    write_table(team_data, output_file)
+    logging.info(f"Data saved for {team_name} to {output_file}")
+
+def mark_team_processed(cache, team_url):
+    """Mark a team's pages processed once its data is saved, so later runs can skip them while they're unchanged."""
+    if cache is None:
+        return
+    cache.mark_processed(team_url)
+    shooting_url = cache.get_extra(team_url, "shooting_url")
+    if shooting_url:
+        cache.mark_processed(shooting_url)
+
+def scrape_teams(team_urls, team_names, session, cache=None, incremental=False, max_workers=MAX_WORKERS):
+    """Scrape several teams concurrently, saving each one as soon as it finishes.
+
+    Requests are throttled per host by the shared rate limiters, so total time approaches
+    the number of requests divided by REQUESTS_PER_MINUTE rather than a sum of fixed sleeps.
+    In incremental mode only matches newer than each team's stored data are appended.
+    Returns the newly saved match rows.
+    """
+    start = time.perf_counter()
+    completed = 0
+    saved_data = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(scrape_team_data, team_url, team_name, session, cache): (team_name, team_url)
+            for team_url, team_name in zip(team_urls, team_names)
+        }
+        for future in as_completed(futures):
+            team_name, team_url = futures[future]
+            completed += 1
+            try:
+                team_data = future.result()
+            except Exception as e:
+                logging.error(f"Scraping failed for {team_name}: {e}")
+                continue
 
-        soup = BeautifulSoup(standings_page.text, "html.parser")
+            if team_data is not None and not team_data.empty:
+                try:
+                    new_rows = team_data
+                    if incremental:
+                        team_data, new_rows = merge_new_matches(load_team_match_data(team_name), team_data)
+                        logging.info(f"Found {len(new_rows)} new matches for {team_name}")
+                    if not new_rows.empty:
+                        save_team_data(team_data, team_name)
+                        saved_data.append(new_rows)
+                except Exception as e:
+                    logging.error(f"Saving failed for {team_name}: {e}")
+                else:
+                    # Only now do the pages count as unchanged; a failure above leaves them to be parsed again
+                    mark_team_processed(cache, team_url)
+            logging.info(f"[{completed}/{len(futures)}] Finished {team_name} ({time.perf_counter() - start:.1f}s elapsed)")
+
+    return pd.concat(saved_data, ignore_index=True) if saved_data else pd.DataFrame(columns=MATCH_KEY_COLS)
+
+def scrape(team_input="", incremental=False):
+    """Scrape the standings page, then the teams matching `team_input` (comma-separated; all teams when empty).
+
+    In incremental mode only teams that have played since their stored data are scraped.
+    Returns the newly saved match rows, or None if the standings or teams could not be read.
+    """
+    # Create a session and page cache
+    session = create_session()
+    cache = create_page_cache()
+
+    # Get the HTML from the standings page
+    standings_page = fetch_page(session, standings_url(COMPETITION, SEASON), cache)
+    if not check_data(standings_page, "Request failed. Check the URL or retry after some time in case of temporary IP blocking. Exiting..."):
+        return None
+
+    soup = BeautifulSoup(standings_page.text, "html.parser")
+
+    # Get the standings table
+    standings_table = soup.select_one('table.stats_table')
+    if not check_data(standings_table, "Standings table not found. The page structure might have changed. Exiting..."):
+        return None
+
+    # Extract links to team stats pages
+    team_links = [l.get("href") for l in standings_table.find_all('a')]
+    team_urls = [l for l in team_links if TEAM_URL_PART in l]
+    absolute_team_urls = [f"{BASE_URL}{t}" for t in team_urls]
+
+    # Extract clean team names
+    team_names = [team_name_from_url(url) for url in absolute_team_urls]
+    standings_teams = list(team_names)
+
+    if team_input:
+        matched_teams = process_team_input(team_input, team_names)
+
+        if not check_data(matched_teams, "No valid teams found. Exiting..."):
+            return None
 
-        # Get the standings table
-        standings_table = soup.select_one('table.stats_table')
-        if not check_data(standings_table, "Standings table not found. The page structure might have changed. Exiting..."):
-            exit()
+        # Filter URLs and teams to just those that match the input
+        team_names = matched_teams
+        matched_teams_lower = {name.lower() for name in matched_teams}
+        absolute_team_urls = [url for url, name in zip(absolute_team_urls, team_names) if name.lower() in matched_teams_lower]
 
-        # Extract links to team stats pages
-        team_links = [l.get("href") for l in standings_table.find_all('a')]
-        team_urls = [l for l in team_links if TEAM_URL_PART in l]
-        absolute_team_urls = [f"{BASE_URL}{t}" for t in team_urls]
+        logging.info(f"Scraping data for selected teams: {', '.join(team_names)}")
+    else:
+        logging.info("Scraping data for all teams.")
 
-        # Extract clean team names
-        team_names = [url.split("/")[-1].replace("-Stats", "").replace("-", " ") for url in absolute_team_urls]
+    # Only teams that have played since their stored data need scraping in incremental mode
+    if incremental:
+        absolute_team_urls, team_names = teams_with_new_matches(absolute_team_urls, team_names, get_matches_played(standings_table))
 
-        # Prompt the user for team selection
-        team_input = input("Enter team names to scrape (comma-separated, or leave blank for all teams): ").strip().lower()
+    new_match_data = scrape_teams(absolute_team_urls, team_names, session, cache, incremental)
 
-        if team_input:
-            matched_teams = process_team_input(team_input, team_names)
+    unresolved = unresolved_opponents(new_match_data, standings_teams)
+    if unresolved:
+        logging.error(
+            f"Opponents not matching any {COMPETITION} team: {', '.join(unresolved)}. Their fixtures will be "
+            f"dropped when preprocessing; add them to MAPPED_TEAM_NAMES['{COMPETITION}']."
+        )
 
-            if not check_data(matched_teams, "No valid teams found. Exiting..."):
-                exit()
+    logging.info("Scraping completed.")
+    return new_match_data
 
-            # Filter URLs and teams to just those that match the input
-            team_names = matched_teams
-            matched_teams_lower = {name.lower() for name in matched_teams}
-            absolute_team_urls = [url for url, name in zip(absolute_team_urls, team_names) if name.lower() in matched_teams_lower]
-            
-            logging.info(f"Scraping data for selected teams: {', '.join(team_names)}")
-        else:
-            logging.info("Scraping data for all teams.")
+def main():
+    # Ask user if they want to scrape, aggregate, both, or only fetch new matches
+    action = input("Enter 'scrape' to scrape new data, 'aggregate' to aggregate existing data, 'both' for both, or 'update' to fetch and aggregate only new matches: ").strip().lower()
+    incremental = action == 'update'
+    do_scrape = action in ('scrape', 'both', 'update')
+    do_aggregate = action in ('aggregate', 'both')
 
-        for i, (team_url, team_name) in enumerate(zip(absolute_team_urls, team_names)):
-            team_data = scrape_team_data(team_url, team_name, session)
-            if not team_data.empty:
-                # Define the output file path
-                output_file = os.path.join(TEAM_MATCH_DATA_DIR, f"{team_name.replace(' ', '_')}_match_data.csv")
+    # Ensure folders exists for output
+    os.makedirs(DATA_DIR, exist_ok=True)
+    os.makedirs(TEAM_MATCH_DATA_DIR, exist_ok=True)
+    logging.info(f"Using {COMPETITION} {SEASON} data in {os.path.dirname(TEAM_MATCH_DATA_DIR)}")
 
-                # Save the data for the current team to a CSV, overwriting if the file already exists
-                team_data.to_csv(output_file, index=False)
-                logging.info(f"Data saved for {team_name} to {output_file}")
+    if do_scrape:
+        # Prompt the user for team selection
+        team_input = input("Enter team names to scrape (comma-separated, or leave blank for all teams): ").strip().lower()
 
-            # Random sleep to prevent blocking
-            if i < len(team_names) - 1:
-                sleep_time = random.uniform(10, 20)
-                logging.info(f"Sleeping for {sleep_time:.2f} seconds...")
-                time.sleep(sleep_time)
+        new_match_data = scrape(team_input, incremental)
+        if new_match_data is None:
+            exit()
 
-        logging.info("Scraping completed.")
+        if incremental:
+            append_to_aggregate(new_match_data, AGGREGATED_FILE)
 
     if do_aggregate:
         aggregate_data(TEAM_MATCH_DATA_DIR, AGGREGATED_FILE)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()